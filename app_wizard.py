@@ -1,59 +1,270 @@
 import sys
 import os
+import time
 import tempfile
+import queue
+import threading
+from collections import OrderedDict
 from PySide6.QtWidgets import (QWizard, QWidget, QWizardPage, QVBoxLayout, QLineEdit, 
                              QLabel, QListWidget,QListWidgetItem, QAbstractItemView, QSplitter,
-                             QComboBox, QFileDialog, QMessageBox, QProgressDialog, QApplication)
-from PySide6.QtCore import Qt, QSize, QThread, Signal
-from PySide6.QtGui import QIcon
+                             QComboBox, QFileDialog, QMessageBox, QApplication,
+                             QStackedWidget, QPushButton, QCheckBox, QListView, QHBoxLayout)
+from PySide6.QtCore import Qt, QSize, QThread, Signal, QSettings, QTimer
+from PySide6.QtGui import QIcon, QImage, QPixmap, QPainter
 
-from utils import read_excel, resize_image, create_word_doc, SUPPORTED_FORMATS
-from widgets import NameListWidget, PhotoDropWidget, FileDropZone
+from utils import (read_excel, read_excel_photos, process_photos, PipelineMetrics, PIPELINE_STAGES,
+                   WordExporter, create_html_gallery,
+                   expand_photo_sources, normalization_available, paginate_associations,
+                   grid_photo_box, GRID_NAME_LINE_PT)
+from catalog import PhotoCatalog
+from widgets import NameListWidget, PhotoDropWidget, FileDropZone, RapidAssociationWidget
 
 # --- Thread de Traitement (pour ne pas geler l'UI) ---
 
+# Taille des miniatures produites par le thread (icônes de la page 4)
+THUMBNAIL_SIZE = 120
+# Les miniatures sont envoyées à l'interface par lots : dès qu'un lot
+# atteint ce nombre d'images ou que ce délai (secondes) est écoulé, même
+# si aucune photo n'est arrivée entre-temps (les mesures restent à jour)
+BATCH_MAX_COUNT = 32
+BATCH_MAX_DELAY = 0.1
+# Sous-dossier (du dossier de cache) des fichiers de mesures de chaque import
+METRICS_DIR = "metrics"
+# Noms affichés des étapes mesurées (voir utils.PIPELINE_STAGES)
+STAGE_LABELS = {'read': "lecture", 'wait': "attente mémoire", 'decode': "décodage",
+                'crop': "rognage", 'normalize': "harmonisation", 'encode': "encodage",
+                'write': "écriture", 'thumbnail': "miniature"}
+
+def format_metrics(snapshot):
+    """ Résumé lisible d'un PipelineMetrics.snapshot() (débit, volumes, étapes). """
+    eta = snapshot['eta_s']
+    eta_text = f"{int(eta) // 60}:{int(eta) % 60:02d}" if eta is not None else "--:--"
+    lines = [f"{snapshot['images_per_s']:.1f} images/s · reste {eta_text} · "
+             f"lu {snapshot['bytes_read'] / 1e6:.1f} Mo · écrit {snapshot['bytes_written'] / 1e6:.1f} Mo"]
+    # Dans l'ordre du traitement (le dict passé par un signal Qt revient trié)
+    stages = [f"{STAGE_LABELS[stage]} {snapshot['stages'][stage]['p50_ms']:.0f}/"
+              f"{snapshot['stages'][stage]['p95_ms']:.0f}"
+              for stage in PIPELINE_STAGES if stage in snapshot['stages']]
+    if stages:
+        lines.append("ms p50/p95 : " + " · ".join(stages))
+    return "\n".join(lines)
+
+def pil_to_qimage(img):
+    """ Convertit une image PIL (RGB ou RGBA) en QImage indépendante. """
+    if img.mode == 'RGBA':
+        qimage = QImage(img.tobytes(), img.width, img.height, img.width * 4, QImage.Format_RGBA8888)
+    else:
+        qimage = QImage(img.tobytes(), img.width, img.height, img.width * 3, QImage.Format_RGB888)
+    return qimage.copy() # Détacher des octets Python temporaires
+
 class PhotoProcessingThread(QThread):
     """
-    Thread pour redimensionner les images en arrière-plan.
+    Thread pour redimensionner les images en arrière-plan (annulable avec
+    cancel(), qui arrête la lecture et le décodage sans attendre la fin du lot).
+    Les fichiers sont lus à l'avance et décodés en parallèle, sous un
+    budget mémoire commun (voir utils.process_photos).
+    Les miniatures sont préparées ici en QImage et envoyées par lots :
+    le thread de l'interface n'a plus qu'à créer les QPixmap. Les résultats
+    sont lus dans un fil séparé, pour que run() envoie le lot en attente à
+    la fin de chaque délai BATCH_MAX_DELAY, même si le traitement est lent.
     """
     progressUpdated = Signal(int) # Progrès (0-100)
-    imageProcessed = Signal(str, str) # Chemin original, chemin traité
+    imagesProcessed = Signal(list) # Lot de (chemin original, chemin traité, QImage miniature)
+    metricsUpdated = Signal(dict) # PipelineMetrics.snapshot() : débit, latences, temps restant
     finished = Signal(int, int) # Nombre succès, nombre échecs
 
-    def __init__(self, file_paths, output_dir):
+    def __init__(self, file_paths, output_dir, normalize=False, workers=None, low_priority=False):
         super().__init__()
         self.file_paths = file_paths
         self.output_dir = output_dir
+        self.normalize = normalize # Harmoniser luminosité / couleurs du lot
+        self.workers = workers # None : un par cœur
+        self.low_priority = low_priority # Threads de travail en priorité basse
+        self.cancel_event = threading.Event() # Transmis à process_photos
+        # Bilan de l'import (mesures par étape), écrit à la fin du traitement
+        self.metrics = PipelineMetrics(len(file_paths))
+        self.metrics_path = os.path.join(output_dir, METRICS_DIR, time.strftime("import-%Y%m%d-%H%M%S")
+                                         + f"-{int(time.time() * 1000) % 1000:03d}.json")
 
     def run(self):
         total = len(self.file_paths)
         success_count = 0
         fail_count = 0
-        for i, path in enumerate(self.file_paths):
-            processed_path = resize_image(path, self.output_dir)
-            if processed_path:
-                self.imageProcessed.emit(path, processed_path)
-                success_count += 1
-            else:
-                fail_count += 1
-            self.progressUpdated.emit(int((i + 1) * 100 / total))
+        batch = []
+        last_flush = time.monotonic()
+        results = queue.Queue() # Résultats, puis None à la fin
+        reader = threading.Thread(target=self._read_results, args=(results,), daemon=True)
+        reader.start()
+        while not self.cancel_event.is_set():
+            try:
+                result = results.get(timeout=max(0.0, last_flush + BATCH_MAX_DELAY - time.monotonic()))
+            except queue.Empty:
+                result = () # Délai écoulé sans nouvelle photo
+            if result is None:
+                break
+            if result:
+                path, processed_path, thumbnail = result
+                if processed_path:
+                    batch.append((path, processed_path, pil_to_qimage(thumbnail)))
+                    success_count += 1
+                else:
+                    fail_count += 1
+            if len(batch) >= BATCH_MAX_COUNT or time.monotonic() - last_flush >= BATCH_MAX_DELAY:
+                self._flush(batch, success_count + fail_count, total)
+                batch = []
+                last_flush = time.monotonic()
+        reader.join() # Attend les photos en cours puis libère le pool
+        if self.cancel_event.is_set():
+            self.metrics.settings['cancelled'] = True
+            self.metrics.write(self.metrics_path)
+            return
+        self._flush(batch, total, total)
+        self.metrics.write(self.metrics_path)
         
         self.finished.emit(success_count, fail_count)
 
+    def cancel(self):
+        """ Demande l'arrêt : plus aucune photo n'est lue ni commencée. """
+        self.cancel_event.set()
+        self.requestInterruption()
+
+    def _read_results(self, results):
+        try:
+            for result in process_photos(self.file_paths, self.output_dir, thumbnail_size=THUMBNAIL_SIZE,
+                                         normalize=self.normalize, workers=self.workers,
+                                         metrics=self.metrics, cancel=self.cancel_event,
+                                         low_priority=self.low_priority):
+                results.put(result)
+        finally:
+            results.put(None)
+
+    def _flush(self, batch, done, total):
+        if batch:
+            self.imagesProcessed.emit(batch)
+        self.progressUpdated.emit(int(done * 100 / total))
+        self.metricsUpdated.emit(self.metrics.snapshot())
+
+# --- Aperçu des pages de l'export (page 5) ---
+
+# Page Lettre (8.5 x 11 pouces, modèle par défaut de python-docx) à 16 px
+# par pouce, marges de 0.5 pouce comme dans create_word_doc
+PREVIEW_DPI = 16
+PREVIEW_WIDTH = int(8.5 * PREVIEW_DPI)
+PREVIEW_HEIGHT = 11 * PREVIEW_DPI
+PREVIEW_MARGIN = PREVIEW_DPI // 2
+# Nombre de pages rendues gardées en mémoire (toutes mises en page confondues)
+PREVIEW_CACHE_PAGES = 200
+
+def render_preview_page(cols, rows, cells):
+    """
+    Dessine une page de l'export en basse résolution, comme create_word_doc
+    la met en page : 'cols' colonnes, photo dans la place donnée par
+    utils.grid_photo_box (largeur et hauteur de page), nom dessous.
+    'cells' est une liste de (QImage de la photo ou chemin, nom).
+    Utilisable hors du thread de l'interface (QImage et QPainter seulement).
+    """
+    page = QImage(PREVIEW_WIDTH, PREVIEW_HEIGHT, QImage.Format_RGB32)
+    page.fill(Qt.white)
+    painter = QPainter(page)
+    painter.setRenderHint(QPainter.SmoothPixmapTransform)
+    font = painter.font()
+    font.setPixelSize(max(5, PREVIEW_DPI * 10 // 72)) # Nom en 10 pt
+    painter.setFont(font)
+    text_height = painter.fontMetrics().height()
+
+    cell_width = (PREVIEW_WIDTH - 2 * PREVIEW_MARGIN) / cols
+    point = PREVIEW_DPI / 72
+    box_width, box_height = grid_photo_box(cols, rows, PREVIEW_WIDTH - 2 * PREVIEW_MARGIN,
+                                           PREVIEW_HEIGHT - 2 * PREVIEW_MARGIN, point)
+    # Le nom est dessiné plus grand que 10 pt (lisibilité) : la photo lui laisse la place
+    box_height -= max(0, text_height - GRID_NAME_LINE_PT * point)
+    y = PREVIEW_MARGIN
+    for row_start in range(0, len(cells), cols):
+        row_height = 0
+        for col, (photo, name) in enumerate(cells[row_start:row_start + cols]):
+            image = photo if isinstance(photo, QImage) else QImage(photo)
+            x = int(PREVIEW_MARGIN + col * cell_width)
+            photo_height = 0
+            if not image.isNull():
+                image = image.scaled(int(box_width), int(box_height), Qt.KeepAspectRatio,
+                                     Qt.SmoothTransformation)
+                painter.drawImage(x + (int(cell_width) - image.width()) // 2, y, image)
+                photo_height = image.height()
+            name = painter.fontMetrics().elidedText(name, Qt.ElideRight, int(cell_width))
+            painter.drawText(x, y + photo_height, int(cell_width), text_height, Qt.AlignHCenter, name)
+            row_height = max(row_height, photo_height + text_height)
+        y += row_height
+    painter.end()
+    return page
+
+class PagePreviewThread(QThread):
+    """
+    Rend les pages de l'aperçu en arrière-plan, une à une, dans l'ordre
+    demandé (pages visibles d'abord). Chaque appel à request() remplace
+    les pages qui restent à rendre.
+    """
+    pageRendered = Signal(object, QImage) # (empreinte de la page, image)
+
+    def __init__(self):
+        super().__init__()
+        self.condition = threading.Condition()
+        self.jobs = [] # (empreinte, colonnes, lignes, cellules)
+        self.stopping = False
+
+    def request(self, jobs):
+        with self.condition:
+            self.jobs = list(jobs)
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.jobs and not self.stopping:
+                    self.condition.wait()
+                if self.stopping:
+                    return
+                key, cols, rows, cells = self.jobs.pop(0)
+            self.pageRendered.emit(key, render_preview_page(cols, rows, cells))
+
 # --- L'Assistant Principal (Wizard) ---
 
+# Réglages mémorisés entre deux lancements (dossier de photos récent)
+SETTINGS_ORGANIZATION = "TrombinoApp"
+SETTINGS_APPLICATION = "TrombinoApp"
+RECENT_PHOTO_FOLDER_KEY = "recentPhotoFolder"
+
 class TrombinoscopeWizard(QWizard):
     """
     L'assistant principal qui guide l'utilisateur à travers les 5 étapes.
-    Il stocke également les données partagées entre les pages.
+    Il stocke également les données partagées entre les pages et possède
+    le traitement des photos, qui continue quelle que soit la page affichée.
     """
+    processingProgress = Signal(int) # Progrès du lot en cours (0-100)
+    processingMetrics = Signal(dict) # Mesures du lot en cours (voir PipelineMetrics.snapshot)
+    processingStateChanged = Signal() # Un traitement démarre ou se termine
+    photosBatchAdding = Signal(bool) # True avant d'ajouter un lot au catalogue, False après
     def __init__(self, parent=None):
         super().__init__(parent)
         
         # Données partagées
-        self.student_list = []
-        self.processed_photos = {} # dict {original_path: processed_path}
-        self.associations = {} # dict {processed_path: student_name}
+        self.catalog = PhotoCatalog() # Étudiants, photos traitées et associations
+        self.thumbnails = {} # dict {processed_path: QImage} (miniatures en mémoire)
+        self.roster_photos = {} # dict {original_path: student_name} (photos insérées dans l'Excel)
+        
+        # Traitement des photos, commencé dès qu'elles sont connues (voir processPhotos)
+        self.photo_sources = [] # Fichiers, dossiers ou archives choisis par l'utilisateur
+        self.normalize_photos = False # Harmoniser luminosité / couleurs du lot
+        self.processingThread = None
+        self.pending_photos = [] # Photos à traiter après le lot en cours
+        self.queued_photos = set() # Photos déjà envoyées au traitement
+        self.processing_failures = 0
+        self.last_metrics_path = None # Fichier de mesures du dernier lot terminé
         
         # Créer un dossier temporaire pour les images redimensionnées
         self.temp_dir = os.path.join(tempfile.gettempdir(), "TrombinoAppCache")
@@ -68,6 +279,159 @@ class TrombinoscopeWizard(QWizard):
         self.setWindowTitle("Assistant Trombinoscope")
         self.setWizardStyle(QWizard.ModernStyle)
         self.setFixedSize(800, 600) # Taille fixe pour la simplicité
+        self.finished.connect(lambda result: self.cancelProcessing())
+
+    # --- Traitement des photos en arrière-plan ---
+
+    def recentPhotoFolder(self):
+        """ Dernier dossier de photos utilisé (None s'il n'existe plus). """
+        folder = QSettings(SETTINGS_ORGANIZATION, SETTINGS_APPLICATION).value(RECENT_PHOTO_FOLDER_KEY)
+        return folder if folder and os.path.isdir(folder) else None
+
+    def processPhotos(self, sources, speculative=False):
+        """
+        Remplace les photos du trombinoscope par celles de 'sources'
+        (fichiers, archives ZIP ou dossiers) et lance leur traitement sans
+        attendre : l'utilisateur continue sur les autres pages et les photos
+        arrivent dans le catalogue au fur et à mesure.
+        'speculative' : photos choisies avant la page 3 (dossier récent,
+        dépôt anticipé), traitées en priorité basse sur la moitié des cœurs.
+        Retourne le nombre de photos trouvées.
+        """
+        photo_paths = expand_photo_sources(sources)
+        if not photo_paths:
+            return 0
+        self.cancelProcessing()
+        self.photo_sources = list(sources)
+        self.catalog.clear_photos()
+        self.thumbnails = {}
+        self.queued_photos = set()
+        self.processing_failures = 0
+        
+        # Retenir le dossier pour le proposer au prochain trombinoscope
+        folder = sources[0] if os.path.isdir(sources[0]) else os.path.dirname(sources[0])
+        QSettings(SETTINGS_ORGANIZATION, SETTINGS_APPLICATION).setValue(RECENT_PHOTO_FOLDER_KEY, folder)
+        
+        # Les photos du fichier Excel sont toujours traitées avec les autres
+        self.queuePhotos(list(self.roster_photos) + photo_paths, speculative)
+        return len(photo_paths)
+
+    def reprocessPhotos(self):
+        """
+        Retraite toutes les photos (ex: harmonisation activée ou désactivée)
+        sans vider le catalogue : add_photo garde l'enregistrement d'une
+        photo d'origine retraitée, et donc les associations déjà faites.
+        """
+        photo_paths = list(self.roster_photos) + expand_photo_sources(self.photo_sources)
+        self.cancelProcessing()
+        self.queued_photos = set()
+        self.processing_failures = 0
+        self.queuePhotos(photo_paths)
+
+    def processRosterPhotos(self):
+        """ Associe ou met en traitement les photos insérées dans le fichier Excel. """
+        missing = []
+        for original_path, student_name in self.roster_photos.items():
+            photo_id = self.catalog.photo_id_by_original(original_path)
+            if photo_id is None:
+                missing.append(original_path)
+            else:
+                self.catalog.assign_name(self.catalog.photos[photo_id].processed_path, student_name)
+        self.queuePhotos(missing, speculative=True)
+
+    def queuePhotos(self, photo_paths, speculative=False):
+        """ Ajoute des photos au traitement (après le lot en cours s'il y en a un). """
+        photo_paths = [path for path in photo_paths if path not in self.queued_photos]
+        self.queued_photos.update(photo_paths)
+        self.pending_photos.extend(photo_paths)
+        if self.processingThread is None and self.pending_photos:
+            self.startNextBatch(speculative)
+
+    def startNextBatch(self, speculative=False):
+        photo_paths, self.pending_photos = self.pending_photos, []
+        workers = max(1, (os.cpu_count() or 2) // 2) if speculative else None
+        self.processingThread = PhotoProcessingThread(photo_paths, self.temp_dir,
+                                                      normalize=self.normalize_photos, workers=workers,
+                                                      low_priority=speculative)
+        self.processingThread.progressUpdated.connect(self.processingProgress)
+        self.processingThread.metricsUpdated.connect(self.processingMetrics)
+        self.processingThread.imagesProcessed.connect(self.onImagesProcessed)
+        self.processingThread.finished.connect(self.onProcessingFinished)
+        self.processingThread.start(QThread.LowPriority if speculative else QThread.NormalPriority)
+        self.processingStateChanged.emit()
+
+    def isProcessing(self):
+        return self.processingThread is not None
+
+    def prioritizeProcessing(self):
+        """
+        L'utilisateur attend les photos : un lot spéculatif (moitié des cœurs,
+        threads en priorité basse) est arrêté, et les photos qu'il n'a pas
+        encore livrées sont relancées sur tous les cœurs en priorité normale.
+        """
+        thread = self.processingThread
+        if thread is None or not thread.low_priority:
+            return
+        # Les lots spéculatifs ne contiennent que des photos absentes du catalogue
+        remaining = [path for path in thread.file_paths if self.catalog.photo_id_by_original(path) is None]
+        pending = self.pending_photos
+        self.cancelProcessing()
+        self.pending_photos = remaining + pending
+        if self.pending_photos:
+            self.startNextBatch()
+
+    def cancelProcessing(self):
+        """ Arrête le traitement en cours (les photos déjà traitées sont gardées). """
+        self.pending_photos = []
+        thread = self.processingThread
+        if thread is None:
+            return
+        self.processingThread = None
+        # N'attend que les photos en cours de décodage (une par cœur au plus)
+        thread.cancel()
+        thread.wait()
+        self.processingStateChanged.emit()
+
+    def onImagesProcessed(self, batch):
+        if self.sender() is not self.processingThread:
+            return # Lot d'un traitement annulé
+        self.photosBatchAdding.emit(True) # Les vues ne se redessinent qu'une fois par lot
+        for original_path, processed_path, thumbnail in batch:
+            # La miniature doit être en place avant que le catalogue notifie
+            # les vues (voir photoIcon), sauf si ce fichier traité appartient
+            # à une autre photo d'origine (refusée par add_photo)
+            owner = self.catalog.photo_id(processed_path)
+            if owner is None or self.catalog.photos[owner].original_path == original_path:
+                self.thumbnails[processed_path] = thumbnail
+            # Stocker le résultat (les pages suivent via le catalogue)
+            if self.catalog.add_photo(original_path, processed_path) is None:
+                continue
+            # Les photos insérées dans le fichier Excel arrivent déjà associées
+            student_name = self.roster_photos.get(original_path)
+            if student_name:
+                self.catalog.assign_name(processed_path, student_name)
+        self.photosBatchAdding.emit(False)
+
+    def onProcessingFinished(self, success_count, fail_count):
+        if self.sender() is not self.processingThread:
+            return
+        self.processing_failures += fail_count
+        self.last_metrics_path = self.processingThread.metrics_path
+        self.processingThread = None
+        if self.pending_photos:
+            self.startNextBatch(speculative=True)
+        else:
+            self.processingStateChanged.emit()
+
+    def photoIcon(self, processed_path):
+        """
+        Icône d'une photo traitée, depuis la miniature en mémoire si elle
+        existe (évite de relire et décoder le fichier).
+        """
+        thumbnail = self.thumbnails.get(processed_path)
+        if thumbnail is None:
+            return QIcon(processed_path)
+        return QIcon(QPixmap.fromImage(thumbnail))
 
 
 # --- Page 1: Démarrer ---
@@ -100,6 +464,22 @@ class StartPage(QWizardPage):
         self.descEdit = QLineEdit()
         self.descEdit.setMaximumWidth(1000)
         content_layout.addWidget(self.descEdit, 0, Qt.AlignCenter)
+        
+        content_layout.addSpacing(20)
+        
+        # Photos choisies dès maintenant : leur traitement avance pendant
+        # que l'utilisateur importe la liste Excel
+        content_layout.addWidget(QLabel("Photos (optionnel, préparées en arrière-plan):"))
+        photos_layout = QHBoxLayout()
+        self.recentButton = QPushButton()
+        self.recentButton.clicked.connect(self.useRecentFolder)
+        photos_layout.addWidget(self.recentButton)
+        self.folderButton = QPushButton("Choisir un dossier...")
+        self.folderButton.clicked.connect(self.chooseFolder)
+        photos_layout.addWidget(self.folderButton)
+        content_layout.addLayout(photos_layout)
+        self.photosLabel = QLabel()
+        content_layout.addWidget(self.photosLabel, 0, Qt.AlignCenter)
 
         # Centrer le bloc de contenu dans la page
         main_layout.addStretch(1) # Ressort en haut
@@ -110,6 +490,30 @@ class StartPage(QWizardPage):
         self.registerField("trombiName*", self.nameEdit)
         self.registerField("trombiDesc", self.descEdit)
 
+    def initializePage(self):
+        folder = self.wizard().recentPhotoFolder()
+        self.recentButton.setVisible(folder is not None)
+        if folder:
+            self.recentButton.setText(f"Dossier récent : {os.path.basename(folder) or folder}")
+            self.recentButton.setToolTip(folder)
+
+    def useRecentFolder(self):
+        self.startPhotos(self.wizard().recentPhotoFolder())
+
+    def chooseFolder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Dossier des photos")
+        if folder:
+            self.startPhotos(folder)
+
+    def startPhotos(self, folder):
+        if not folder:
+            return
+        count = self.wizard().processPhotos([folder], speculative=True)
+        if count:
+            self.photosLabel.setText(f"<font color='green'>{count} photos en préparation.</font>")
+        else:
+            self.photosLabel.setText("<font color='red'>Aucune photo dans ce dossier.</font>")
+
 # --- Page 2: Importation de la Liste ---
 
 class ExcelPage(QWizardPage):
@@ -128,7 +532,8 @@ class ExcelPage(QWizardPage):
         content_layout = QVBoxLayout(content_widget)
         
         # --- Contenu ---
-        self.dropZone = FileDropZone("Glissez-déposez votre fichier Excel ici\nou cliquez pour sélectionner")
+        self.dropZone = FileDropZone("Glissez-déposez votre fichier Excel ici\nou cliquez pour sélectionner\n"
+                                     "(les photos peuvent être déposées en même temps)")
         self.dropZone.setMinimumSize(500, 200) # Donne une taille minimale
         content_layout.addWidget(self.dropZone)
         
@@ -162,28 +567,46 @@ class ExcelPage(QWizardPage):
         if not file_paths:
             return
         
-        filepath = file_paths[0]
-        if not filepath.endswith('.xlsx'):
-            self.statusLabel.setText("<font color='red'>Erreur : Le fichier doit être un .xlsx</font>")
+        # Photos déposées en même temps que la liste : commencer leur traitement
+        excel_paths = [path for path in file_paths if path.lower().endswith('.xlsx')]
+        photo_sources = [path for path in file_paths if not path.lower().endswith('.xlsx')]
+        photo_count = self.wizard().processPhotos(photo_sources, speculative=True) if photo_sources else 0
+        
+        if not excel_paths:
+            if photo_count:
+                self.statusLabel.setText(f"<font color='green'>{photo_count} photos en préparation.</font> "
+                                         "Déposez maintenant le fichier Excel.")
+            else:
+                self.statusLabel.setText("<font color='red'>Erreur : Le fichier doit être un .xlsx</font>")
             return
+        
+        filepath = excel_paths[0]
             
         students = read_excel(filepath)
         if students is None:
             self.statusLabel.setText("<font color='red'>Erreur : Impossible de lire le fichier.</font>")
             return
             
-        self.wizard().student_list = students
+        self.wizard().catalog.set_students(students)
+        # Photos insérées dans le classeur à côté des noms (déjà associées)
+        self.wizard().roster_photos = read_excel_photos(filepath)
+        self.wizard().processRosterPhotos()
         
         self.previewList.clear()
         self.previewList.addItems(students)
         self.previewList.setVisible(True)
-        self.statusLabel.setText(f"<font color='green'>{len(students)} étudiants importés avec succès.</font>")
+        msg = f"<font color='green'>{len(students)} étudiants importés avec succès."
+        if self.wizard().roster_photos:
+            msg += f"<br>{len(self.wizard().roster_photos)} photos trouvées dans le fichier."
+        if photo_count:
+            msg += f"<br>{photo_count} photos en préparation."
+        self.statusLabel.setText(msg + "</font>")
         
         self.completeChanged.emit() # Signale que la page est "complète"
 
     def isComplete(self):
         # Le bouton "Suivant" ne s'active que si la liste est chargée
-        return len(self.wizard().student_list) > 0
+        return self.wizard().catalog.student_count() > 0
 
 # --- Page 3: Importation des Photos ---
 
@@ -201,11 +624,15 @@ class PhotosPage(QWizardPage):
         content_layout = QVBoxLayout(content_widget)
 
         # --- Contenu ---
-        self.dropZone = FileDropZone("Glissez-déposez les photos ici (JPG, PNG, ...)")
+        self.dropZone = FileDropZone("Glissez-déposez les photos ici (JPG, PNG, ...)\nou un dossier / une archive ZIP de photos")
         self.dropZone.setMinimumSize(500, 200)
         content_layout.addWidget(self.dropZone)
         self.dropZone.filesDropped.connect(self.handlePhotosDrop)
         
+        self.normalizeCheck = QCheckBox("Harmoniser la luminosité et les couleurs des photos")
+        self.normalizeCheck.setEnabled(normalization_available()) # Nécessite NumPy
+        content_layout.addWidget(self.normalizeCheck, 0, Qt.AlignCenter)
+        
         self.statusLabel = QLabel("En attente de photos...")
         content_layout.addWidget(self.statusLabel, 0, Qt.AlignCenter)
         
@@ -217,7 +644,20 @@ class PhotosPage(QWizardPage):
         self.photoPreview.setMinimumWidth(450)
         content_layout.addWidget(self.photoPreview)
         
-        self.processingThread = None
+        # Débit, volumes et latences par étape du traitement en cours
+        self.metricsLabel = QLabel()
+        self.metricsLabel.setStyleSheet("QLabel { font-size: 12px; color: #666; }")
+        self.metricsLabel.setAlignment(Qt.AlignCenter)
+        self.metricsLabel.setVisible(False)
+        content_layout.addWidget(self.metricsLabel, 0, Qt.AlignCenter)
+        
+        # Le traitement n'est pas bloquant : on peut l'arrêter ou passer
+        # à l'association pendant qu'il continue
+        self.cancelButton = QPushButton("Arrêter le traitement")
+        self.cancelButton.setVisible(False)
+        content_layout.addWidget(self.cancelButton, 0, Qt.AlignCenter)
+        
+        self.listening = False
         # --- Fin Contenu ---
         
         # Centrer le bloc de contenu dans la page
@@ -225,51 +665,78 @@ class PhotosPage(QWizardPage):
         main_layout.addWidget(content_widget, 0, Qt.AlignHCenter) # Centre le bloc horizontalement
         main_layout.addStretch(1)
 
+    def initializePage(self):
+        wizard = self.wizard()
+        if not self.listening:
+            # Suivre le traitement possédé par l'assistant, commencé ici ou avant
+            self.listening = True
+            wizard.catalog.add_listener(self.onCatalogChanged)
+            wizard.processingProgress.connect(self.dropZone.progressBar.setValue)
+            wizard.processingProgress.connect(lambda value: self.onProcessingStateChanged())
+            wizard.processingMetrics.connect(self.onMetricsUpdated)
+            wizard.processingStateChanged.connect(self.onProcessingStateChanged)
+            wizard.photosBatchAdding.connect(lambda adding: self.photoPreview.setUpdatesEnabled(not adding))
+            self.cancelButton.clicked.connect(wizard.cancelProcessing)
+            self.normalizeCheck.setChecked(wizard.normalize_photos)
+            self.normalizeCheck.toggled.connect(self.onNormalizeToggled)
+            self.photoPreview.clear()
+            for photo in wizard.catalog.photos:
+                self.addPreviewItem(photo.processed_path)
+        # L'utilisateur attend maintenant les photos
+        wizard.prioritizeProcessing()
+        self.onProcessingStateChanged()
+
     def handlePhotosDrop(self, file_paths):
-        # Filtrer les fichiers supportés
-        photo_paths = [p for p in file_paths if os.path.splitext(p)[1].lower() in SUPPORTED_FORMATS]
-        
-        if not photo_paths:
+        # Filtrer les fichiers supportés (et lister le contenu des archives ZIP et dossiers)
+        if not self.wizard().processPhotos(file_paths):
             self.statusLabel.setText("<font color='red'>Aucun format d'image valide trouvé.</font>")
-            return
-            
-        self.wizard().processed_photos = {} # Réinitialiser
-        self.photoPreview.clear()
-        
-        # Configurer et démarrer le thread de traitement
-        output_dir = self.wizard().temp_dir
-        self.processingThread = PhotoProcessingThread(photo_paths, output_dir)
-        
-        # Créer une boîte de dialogue de progression
-        self.progressDialog = QProgressDialog("Traitement des images...", "Annuler", 0, 100, self)
-        self.progressDialog.setWindowModality(Qt.WindowModal)
-        
-        self.processingThread.progressUpdated.connect(self.progressDialog.setValue)
-        self.processingThread.imageProcessed.connect(self.onImageProcessed)
-        self.processingThread.finished.connect(self.onProcessingFinished)
-        self.progressDialog.canceled.connect(self.processingThread.terminate) # Permet d'annuler
-        
-        self.processingThread.start()
 
-    def onImageProcessed(self, original_path, processed_path):
-        # Ajouter une miniature à l'aperçu
-        icon = QIcon(processed_path)
-        item = QListWidgetItem(icon, "") # Pas de texte ici
+    def onNormalizeToggled(self, checked):
+        # L'harmonisation porte sur le lot entier : tout retraiter
+        # (les associations déjà faites sont gardées)
+        self.wizard().normalize_photos = checked
+        if self.wizard().photo_sources:
+            self.wizard().reprocessPhotos()
+
+    def onCatalogChanged(self, event, *args):
+        if event == 'photos_cleared':
+            self.photoPreview.clear()
+            self.completeChanged.emit()
+        elif event == 'photo_added':
+            self.addPreviewItem(self.wizard().catalog.photos[args[0]].processed_path)
+            if self.wizard().catalog.photo_count() == 1:
+                self.completeChanged.emit() # La première photo suffit pour continuer
+        elif event == 'photo_updated':
+            # L'aperçu est dans l'ordre des identifiants de photos
+            item = self.photoPreview.item(args[0])
+            if item is not None:
+                item.setIcon(self.wizard().photoIcon(self.wizard().catalog.photos[args[0]].processed_path))
+
+    def addPreviewItem(self, processed_path):
+        item = QListWidgetItem(self.wizard().photoIcon(processed_path), "") # Pas de texte ici
         self.photoPreview.addItem(item)
-        
-        # Stocker le résultat
-        self.wizard().processed_photos[original_path] = processed_path
 
-    def onProcessingFinished(self, success_count, fail_count):
-        self.progressDialog.setValue(100)
-        self.progressDialog.close()
-        
-        self.statusLabel.setText(f"<font color='green'>{success_count} photos traitées.</font> "
-                                 f"<font color='red'>{fail_count} échecs.</font>")
-        self.completeChanged.emit()
+    def onProcessingStateChanged(self):
+        wizard = self.wizard()
+        running = wizard.isProcessing()
+        self.dropZone.progressBar.setVisible(running)
+        self.cancelButton.setVisible(running)
+        count = wizard.catalog.photo_count()
+        if running:
+            self.statusLabel.setText(f"Traitement des images... {count} prêtes "
+                                     "(vous pouvez déjà passer à l'association).")
+        elif count or wizard.processing_failures:
+            self.statusLabel.setText(f"<font color='green'>{count} photos traitées.</font> "
+                                     f"<font color='red'>{wizard.processing_failures} échecs.</font>")
+            if wizard.last_metrics_path:
+                self.metricsLabel.setToolTip(f"Mesures enregistrées dans {wizard.last_metrics_path}")
+
+    def onMetricsUpdated(self, snapshot):
+        self.metricsLabel.setText(format_metrics(snapshot))
+        self.metricsLabel.setVisible(True)
 
     def isComplete(self):
-        return len(self.wizard().processed_photos) > 0
+        return self.wizard().catalog.photo_count() > 0
 
 # --- Page 4: Association Nom-Photo (Étape Critique) ---
 
@@ -281,6 +748,12 @@ class AssociationPage(QWizardPage):
         
         layout = QVBoxLayout(self)
         
+        # Bascule entre le glisser-déposer et le mode clavier
+        self.modeButton = QPushButton("Mode clavier")
+        self.modeButton.setCheckable(True)
+        self.modeButton.toggled.connect(self.setRapidMode)
+        layout.addWidget(self.modeButton, 0, Qt.AlignRight)
+        
         # Un 'splitter' permet de redimensionner les deux panneaux
         splitter = QSplitter(Qt.Horizontal)
         
@@ -304,95 +777,147 @@ class AssociationPage(QWizardPage):
         splitter.addWidget(right_panel)
         splitter.setSizes([200, 600]) # Donner plus de place aux photos
         
-        layout.addWidget(splitter)
+        # Mode clavier : une photo en grand et une recherche sur les noms
+        self.rapidWidget = RapidAssociationWidget()
+        
+        self.modeStack = QStackedWidget()
+        self.modeStack.addWidget(splitter)
+        self.modeStack.addWidget(self.rapidWidget)
+        layout.addWidget(self.modeStack)
         
         self.statusLabel = QLabel()
         layout.addWidget(self.statusLabel)
         
+        self.photoItems = {} # dict {processed_path: item de photoGrid}
+        self.viewsBuilt = False
+        self.listening = False
+        
         # Connecter le signal d'association
         
         self.photoGrid.itemAssociated.connect(self.onAssociation)
-
-    # Fichier : app_wizard.py
-# Classe : AssociationPage
+        self.rapidWidget.itemAssociated.connect(self.onAssociation)
+        self.rapidWidget.itemUnassociated.connect(self.onUnassociation)
 
     def initializePage(self):
         """
         Appelée à chaque fois que la page devient active.
         On l'utilise pour charger les données des pages précédentes.
+        Les vues sont ensuite tenues à jour par les notifications du catalogue.
         """
-        # --- DEBUG ---
-        print("\n--- DEBUG PAGE 4: initializePage DÉMARRE ---")
-        # --- FIN DEBUG ---
+        catalog = self.wizard().catalog
+        if not self.listening:
+            catalog.add_listener(self.onCatalogChanged)
+            self.wizard().photosBatchAdding.connect(lambda adding: self.photoGrid.setUpdatesEnabled(not adding))
+            self.listening = True
+        if not self.viewsBuilt:
+            self.buildViews()
+        if self.modeButton.isChecked():
+            self.loadRapidMode()
+        self.updateStatus()
 
+    def buildViews(self):
+        """ Remplit la liste des noms libres et la grille des photos depuis le catalogue. """
+        catalog = self.wizard().catalog
         self.nameList.clear()
         self.photoGrid.clear()
-        self.wizard().associations = {}
+        self.photoItems = {}
         
-        # Charger les noms
-        students = self.wizard().student_list
-        
-        # --- DEBUG ---
-        print(f"DEBUG PAGE 4: {len(students)} étudiants trouvés dans le wizard.")
-        # --- FIN DEBUG ---
-        
-        self.nameList.addItems(students)
+        # Charger les noms (uniquement ceux qui ne sont pas encore associés)
+        self.nameList.addItems(catalog.free_student_names())
         
         # Charger les photos (uniquement celles qui ont été traitées)
-        processed_paths = self.wizard().processed_photos.values()
-        
-        # --- DEBUG ---
-        print(f"DEBUG PAGE 4: {len(processed_paths)} photos trouvées dans le wizard.")
-        # --- FIN DEBUG ---
-        
-        for path in processed_paths:
-            icon = QIcon(path)
-            item = QListWidgetItem(icon, "[Non associé]") # Texte par défaut
-            item.setData(Qt.UserRole, path) # Stocker le chemin de l'image
-            item.setTextAlignment(Qt.AlignCenter)
-            self.photoGrid.addItem(item)
-            
-        self.updateStatus()
-        
-        # --- DEBUG NOUVEAU ---
-        # Ajoutez ces lignes à la toute fin de la fonction
-        print(f"DEBUG PAGE 4: Vérification finale: Drag activé sur NameList? {self.nameList.dragEnabled()}")
-        print(f"DEBUG PAGE 4: Vérification finale: Drops activés sur PhotoGrid? {self.photoGrid.acceptDrops()}")
-        # --- FIN DEBUG NOUVEAU ---
+        self.photoGrid.setUpdatesEnabled(False)
+        for photo in catalog.photos:
+            self.addPhotoItem(photo.id)
+        self.photoGrid.setUpdatesEnabled(True)
+        self.viewsBuilt = True
 
         print(f"DEBUG PAGE 4: Listes (Noms: {self.nameList.count()}, Photos: {self.photoGrid.count()}) peuplées.")
-        print("--- DEBUG PAGE 4: initializePage TERMINÉ ---\n")
-        # --- FIN DEBUG ---
-        """
-        Appelée à chaque fois que la page devient active.
-        On l'utilise pour charger les données des pages précédentes.
-        """
-        self.nameList.clear()
-        self.photoGrid.clear()
-        self.wizard().associations = {}
-        
-        # Charger les noms
-        students = self.wizard().student_list
-        self.nameList.addItems(students)
-        
-        # Charger les photos (uniquement celles qui ont été traitées)
-        processed_paths = self.wizard().processed_photos.values()
-        for path in processed_paths:
-            icon = QIcon(path)
-            item = QListWidgetItem(icon, "[Non associé]") # Texte par défaut
-            item.setData(Qt.UserRole, path) # Stocker le chemin de l'image
-            item.setTextAlignment(Qt.AlignCenter)
-            self.photoGrid.addItem(item)
-            
+
+    def addPhotoItem(self, photo_id):
+        catalog = self.wizard().catalog
+        path = catalog.photos[photo_id].processed_path
+        icon = self.wizard().photoIcon(path)
+        item = QListWidgetItem(icon, catalog.student_name(photo_id) or "[Non associé]") # Texte par défaut
+        item.setData(Qt.UserRole, path) # Stocker le chemin de l'image
+        item.setTextAlignment(Qt.AlignCenter)
+        self.photoGrid.addItem(item)
+        self.photoItems[path] = item
+
+    def onCatalogChanged(self, event, *args):
+        """ Répercute les changements du catalogue sur la liste des noms et la grille. """
+        if event in ('students', 'photos_cleared'):
+            self.viewsBuilt = False # Reconstruites à la prochaine visite
+            return
+        if not self.viewsBuilt:
+            return
+        catalog = self.wizard().catalog
+        if event == 'photo_added':
+            self.addPhotoItem(args[0])
+            if self.modeButton.isChecked():
+                # Après le traitement du lot : les photos de l'Excel arrivent déjà associées
+                QTimer.singleShot(0, lambda photo_id=args[0]: self.addRapidPhoto(photo_id))
+        elif event == 'photo_updated':
+            photo_id, previous_path = args
+            path = catalog.photos[photo_id].processed_path
+            item = self.photoItems.pop(previous_path)
+            item.setData(Qt.UserRole, path)
+            item.setIcon(self.wizard().photoIcon(path))
+            self.photoItems[path] = item
+            if self.modeButton.isChecked():
+                self.rapidWidget.updatePhoto(previous_path, path, item.icon())
+        elif event == 'assigned':
+            photo_id, student_id = args
+            student_name = catalog.students[student_id].name
+            self.photoItems[catalog.photos[photo_id].processed_path].setText(student_name)
+            items = self.nameList.findItems(student_name, Qt.MatchExactly)
+            if items:
+                self.nameList.takeItem(self.nameList.row(items[0]))
+            if self.modeButton.isChecked():
+                self.rapidWidget.nameTaken(catalog.photos[photo_id].processed_path, student_name)
+        elif event == 'unassigned':
+            photo_id, student_id = args
+            path = catalog.photos[photo_id].processed_path
+            self.photoItems[path].setText("[Non associé]")
+            self.nameList.addItem(catalog.students[student_id].name)
+            if self.modeButton.isChecked():
+                self.rapidWidget.nameReleased(path, catalog.students[student_id].name)
+                # La photo redevient à associer (si elle ne l'est pas aussitôt)
+                QTimer.singleShot(0, lambda photo_id=photo_id: self.addRapidPhoto(photo_id))
         self.updateStatus()
 
+    def setRapidMode(self, enabled):
+        if enabled:
+            self.loadRapidMode()
+        self.modeStack.setCurrentIndex(1 if enabled else 0)
+        self.setSubTitle("Tapez le début du nom de la personne affichée, puis Entrée." if enabled else
+                         "Glissez un nom depuis la liste de gauche sur la photo correspondante à droite.")
+
+    def loadRapidMode(self):
+        """ Charge dans le mode clavier les photos et noms encore libres. """
+        catalog = self.wizard().catalog
+        photos = [(photo.processed_path, self.photoItems[photo.processed_path].icon())
+                  for photo in catalog.photos if catalog.student_name(photo.id) is None]
+        self.rapidWidget.load(photos, catalog.free_student_names())
+
+    def addRapidPhoto(self, photo_id):
+        catalog = self.wizard().catalog
+        if not self.viewsBuilt or photo_id >= catalog.photo_count() or catalog.student_name(photo_id):
+            return
+        path = catalog.photos[photo_id].processed_path
+        self.rapidWidget.addPhoto(path, self.photoItems[path].icon())
+
     def onAssociation(self, photo_path, student_name):
-        # Mettre à jour le modèle de données central
-        self.wizard().associations[photo_path] = student_name
-        self.updateStatus()
+        # Mettre à jour le modèle de données central (les vues suivent)
+        if self.wizard().catalog.assign_name(photo_path, student_name) is None and self.modeButton.isChecked():
+            self.loadRapidMode() # Nom déjà pris : repartir de l'état du catalogue
+
+    def onUnassociation(self, photo_path, student_name):
+        self.wizard().catalog.unassign_path(photo_path)
 
     def updateStatus(self):
-        total_photos = self.photoGrid.count()
+        catalog = self.wizard().catalog
+        total_photos = catalog.photo_count() - catalog.assigned_count()
         total_noms = self.nameList.count()
         self.statusLabel.setText(f"Photos restantes : {total_photos} | Noms restants : {total_noms}")
 
@@ -423,16 +948,47 @@ class ExportPage(QWizardPage):
         self.summaryLabel.setAlignment(Qt.AlignCenter)
         content_layout.addWidget(self.summaryLabel)
         
-        content_layout.addSpacing(30)
+        content_layout.addSpacing(10)
         
+        # Mise en page et format côte à côte
+        options_layout = QHBoxLayout()
+        layout_column = QVBoxLayout()
         layout_label = QLabel("Options d'affichage (Photos par page) :")
         layout_label.setAlignment(Qt.AlignCenter)
-        content_layout.addWidget(layout_label)
+        layout_column.addWidget(layout_label)
         
         self.layoutCombo = QComboBox()
         self.layoutCombo.addItems(["3x4 (12)", "4x5 (20)", "5x6 (30)"])
         self.layoutCombo.setMaximumWidth(200)
-        content_layout.addWidget(self.layoutCombo, 0, Qt.AlignCenter)
+        self.layoutCombo.currentIndexChanged.connect(self.refreshPreview)
+        layout_column.addWidget(self.layoutCombo, 0, Qt.AlignCenter)
+        options_layout.addLayout(layout_column)
+        
+        format_column = QVBoxLayout()
+        format_label = QLabel("Format d'export :")
+        format_label.setAlignment(Qt.AlignCenter)
+        format_column.addWidget(format_label)
+        
+        self.formatCombo = QComboBox()
+        self.formatCombo.addItems(["Word (.docx)", "Site web (HTML)"])
+        self.formatCombo.setMaximumWidth(200)
+        self.formatCombo.currentIndexChanged.connect(self.onFormatChanged)
+        format_column.addWidget(self.formatCombo, 0, Qt.AlignCenter)
+        options_layout.addLayout(format_column)
+        content_layout.addLayout(options_layout)
+        
+        # Aperçu des pages Word, rendu en arrière-plan
+        self.previewList = QListWidget()
+        self.previewList.setViewMode(QListView.IconMode)
+        self.previewList.setFlow(QListView.LeftToRight)
+        self.previewList.setWrapping(False)
+        self.previewList.setMovement(QListView.Static)
+        self.previewList.setSelectionMode(QAbstractItemView.NoSelection)
+        self.previewList.setIconSize(QSize(PREVIEW_WIDTH, PREVIEW_HEIGHT))
+        self.previewList.setFixedSize(720, PREVIEW_HEIGHT + 60)
+        self.previewList.setStyleSheet("QListWidget { background: #c8c8c8; }") # Pages blanches visibles
+        self.previewList.horizontalScrollBar().valueChanged.connect(self.requestPreviewPages)
+        content_layout.addWidget(self.previewList, 0, Qt.AlignCenter)
         # --- Fin Contenu ---
         
         # Centrer le bloc de contenu dans la page
@@ -440,25 +996,120 @@ class ExportPage(QWizardPage):
         main_layout.addWidget(content_widget, 0, Qt.AlignCenter) # Centre le bloc
         main_layout.addStretch(1)
         
+        self.previewThread = None
+        self.previewCache = OrderedDict() # {empreinte: QImage}, du moins au plus récent
+        self.previewPages = [] # [(empreinte, colonnes, lignes, cellules)] des pages affichées
+        self.blankPage = QImage(PREVIEW_WIDTH, PREVIEW_HEIGHT, QImage.Format_RGB32)
+        self.blankPage.fill(Qt.lightGray)
+        # Garde le document du dernier export : un nouvel export après une
+        # correction ne reconstruit que les pages modifiées
+        self.wordExporter = WordExporter()
+        
         # L'export est géré par le bouton "Finish" du Wizard
         
     def initializePage(self):
-        associations = self.wizard().associations
-        total_photos = len(self.wizard().processed_photos)
-        total_noms = len(self.wizard().student_list)
+        catalog = self.wizard().catalog
+        assigned = catalog.assigned_count()
         
         msg = f"<b>Récapitulatif :</b><br>"
-        msg += f"- {len(associations)} associations créées.<br>"
-        msg += f"- {total_photos - len(associations)} photos non associées.<br>"
-        msg += f"- {total_noms - len(associations)} noms non associés.<br><br>"
+        msg += f"- {assigned} associations créées.<br>"
+        msg += f"- {catalog.photo_count() - assigned} photos non associées.<br>"
+        msg += f"- {catalog.student_count() - assigned} noms non associés.<br><br>"
         msg += "Prêt à exporter."
         self.summaryLabel.setText(msg)
+        
+        if self.previewThread is None:
+            self.previewThread = PagePreviewThread()
+            self.previewThread.pageRendered.connect(self.onPageRendered)
+            self.previewThread.start()
+            self.wizard().finished.connect(lambda result: self.previewThread.stop())
+        self.refreshPreview()
+
+    def onFormatChanged(self, index):
+        # Pas de pages en HTML
+        self.layoutCombo.setEnabled(index == 0)
+        self.previewList.setVisible(index == 0)
+        self.refreshPreview()
+
+    def refreshPreview(self):
+        """
+        Recalcule les pages de l'export. Une page est identifiée par son
+        empreinte (mise en page + photos, avec leur version, et noms qu'elle
+        contient) : seules les pages dont le contenu a changé sont rendues
+        à nouveau.
+        """
+        if self.previewThread is None or self.formatCombo.currentIndex() != 0:
+            return
+        layout = self.layoutCombo.currentText().split(" ")[0]
+        thumbnails = self.wizard().thumbnails
+        cols, rows, pages = paginate_associations(self.wizard().catalog.associations(), layout)
+        self.previewPages = []
+        for page in pages:
+            key = (layout, tuple((path, self.photoVersion(path), name) for path, name in page))
+            cells = [(thumbnails.get(path, path), name) for path, name in page]
+            self.previewPages.append((key, cols, rows, cells))
+        
+        # Réutiliser les éléments existants de la liste
+        while self.previewList.count() > len(self.previewPages):
+            self.previewList.takeItem(self.previewList.count() - 1)
+        while self.previewList.count() < len(self.previewPages):
+            item = QListWidgetItem(f"Page {self.previewList.count() + 1}")
+            item.setTextAlignment(Qt.AlignHCenter)
+            self.previewList.addItem(item)
+        for i, (key, _, _, _) in enumerate(self.previewPages):
+            if key in self.previewCache:
+                self.previewCache.move_to_end(key)
+                self.setPreviewImage(i, self.previewCache[key])
+            else:
+                self.setPreviewImage(i, self.blankPage)
+        self.requestPreviewPages()
+
+    def photoVersion(self, processed_path):
+        """
+        Version du contenu d'une photo : le chemin traité ne dépend que de la
+        photo d'origine, et une photo retraitée (harmonisation) le garde.
+        """
+        thumbnail = self.wizard().thumbnails.get(processed_path)
+        if thumbnail is not None:
+            return thumbnail.cacheKey() # Nouvelle miniature à chaque traitement
+        try:
+            stat = os.stat(processed_path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def requestPreviewPages(self):
+        """ Demande au thread les pages non encore rendues, visibles d'abord. """
+        if self.previewThread is None:
+            return
+        viewport = self.previewList.viewport().rect()
+        visible, hidden = [], []
+        for i, job in enumerate(self.previewPages):
+            if job[0] in self.previewCache:
+                continue
+            rect = self.previewList.visualItemRect(self.previewList.item(i))
+            (visible if rect.intersects(viewport) else hidden).append(job)
+        self.previewThread.request(visible + hidden)
+
+    def onPageRendered(self, key, image):
+        self.previewCache[key] = image
+        while len(self.previewCache) > PREVIEW_CACHE_PAGES:
+            self.previewCache.popitem(last=False)
+        for i, (page_key, _, _, _) in enumerate(self.previewPages):
+            if page_key == key:
+                self.setPreviewImage(i, image)
+
+    def setPreviewImage(self, index, image):
+        self.previewList.item(index).setIcon(QIcon(QPixmap.fromImage(image)))
 
     def validatePage(self):
         """
         Cette fonction est appelée quand l'utilisateur clique sur "Finish".
         Nous l'utilisons pour déclencher l'exportation.
         """
+        if self.formatCombo.currentIndex() == 1:
+            return self.exportHtml()
+        
         save_path, _ = QFileDialog.getSaveFileName(self, "Enregistrer le trombinoscope", 
                                                    f"{self.field('trombiName')}.docx", 
                                                    "Documents Word (*.docx)")
@@ -467,17 +1118,43 @@ class ExportPage(QWizardPage):
             return False # Annule la fermeture du Wizard
 
         layout = self.layoutCombo.currentText().split(" ")[0]
-        associations = self.wizard().associations
+        associations = self.wizard().catalog.associations()
         
         if not associations:
             QMessageBox.warning(self, "Exportation vide", "Aucune association n'a été faite. L'exportation est annulée.")
             return False
 
-        success = create_word_doc(associations, layout, save_path)
+        success = self.wordExporter.export(associations, layout, save_path)
         
         if success:
-            QMessageBox.information(self, "Exportation Réussie", f"Le fichier a été sauvegardé ici :\n{save_path}")
-            return True # Autorise la fermeture du Wizard
+            # Rester dans l'assistant permet de corriger puis de réexporter rapidement
+            answer = QMessageBox.question(self, "Exportation Réussie",
+                                          f"Le fichier a été sauvegardé ici :\n{save_path}\n\n"
+                                          "Fermer l'assistant ? (Non : revenir aux associations pour corriger "
+                                          "puis réexporter)")
+            return answer == QMessageBox.Yes # Autorise la fermeture du Wizard
         else:
             QMessageBox.critical(self, "Erreur d'Exportation", "Une erreur est survenue lors de la création du fichier Word.")
-            return False # Reste sur la page
\ No newline at end of file
+            return False # Reste sur la page
+
+    def exportHtml(self):
+        output_dir = QFileDialog.getExistingDirectory(self, "Dossier du site web du trombinoscope")
+        
+        if not output_dir:
+            return False # Annule la fermeture du Wizard
+        
+        associations = self.wizard().catalog.associations()
+        
+        if not associations:
+            QMessageBox.warning(self, "Exportation vide", "Aucune association n'a été faite. L'exportation est annulée.")
+            return False
+        
+        success = create_html_gallery(associations, output_dir, self.field('trombiName'))
+        
+        if success:
+            QMessageBox.information(self, "Exportation Réussie",
+                                    f"Le site a été créé ici :\n{os.path.join(output_dir, 'index.html')}")
+            return True # Autorise la fermeture du Wizard
+        else:
+            QMessageBox.critical(self, "Erreur d'Exportation", "Une erreur est survenue lors de la création du site web.")
+            return False # Reste sur la page
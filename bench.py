@@ -0,0 +1,163 @@
+"""
+Mesures de performance de TrombinoApp.
+
+    python bench.py startup [--runs 5] [-- commande ...]
+    python bench.py normalize [--images 200]
+    python bench.py catalog [--entries 1000 50000]
+    python bench.py export [--pages 60]
+
+'startup' lance l'application plusieurs fois (processus neufs) avec
+--startup-benchmark et mesure le temps jusqu'à la première fenêtre.
+Par défaut la commande est "python main.py" ; pour mesurer l'exécutable
+compilé (extraction Nuitka comprise) : python bench.py startup -- dist/main.exe
+
+'normalize' mesure le coût par image de l'harmonisation du lot
+(utils.normalize_batch) sur des images 300x300 synthétiques.
+
+'catalog' mesure la mémoire par entrée du PhotoCatalog et le coût d'une
+association (recherche par chemin + assign/unassign) pour plusieurs tailles.
+
+'export' mesure l'export Word complet puis le réexport après correction
+d'un seul nom (utils.WordExporter), sur des photos 300x300 synthétiques.
+"""
+import sys
+import os
+import time
+import argparse
+import statistics
+import subprocess
+import tracemalloc
+
+STARTUP_BENCHMARK_FLAG = "--startup-benchmark"
+
+def measure_startup(command, runs):
+    """
+    Retourne deux listes de durées (ms) : le temps mesuré depuis le lancement
+    du processus (interpréteur / extraction compris) et le temps mesuré par
+    l'application elle-même depuis le début de main.py.
+    """
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen") # Pas besoin d'écran
+    external, internal = [], []
+    for _ in range(runs):
+        spawn_epoch = time.time()
+        result = subprocess.run(command + [STARTUP_BENCHMARK_FLAG], env=env,
+                                capture_output=True, text=True, timeout=120)
+        values = {}
+        for line in result.stdout.splitlines():
+            if line.startswith("time_to_first_window_ms="):
+                values = dict(field.split("=") for field in line.split())
+        if not values:
+            print(f"Erreur: pas de mesure dans la sortie (code {result.returncode})\n{result.stderr}")
+            continue
+        external.append((float(values["epoch"]) - spawn_epoch) * 1000)
+        internal.append(float(values["time_to_first_window_ms"]))
+    return external, internal
+
+def measure_normalize(count):
+    """ Retourne la durée (ms) par image de normalize_batch sur 'count' images. """
+    import numpy as np
+    from PIL import Image
+    from utils import normalize_batch
+
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        # Exposition et dominante de couleur différentes d'une image à l'autre
+        pixels = rng.integers(0, 256, (300, 300, 3)).astype(np.float32)
+        pixels *= rng.uniform(0.5, 1.3) * rng.uniform(0.85, 1.15, 3)
+        images.append(Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)))
+    start = time.perf_counter()
+    normalize_batch(images)
+    return (time.perf_counter() - start) * 1000 / count
+
+def measure_catalog(entries):
+    """
+    Retourne (octets par entrée, µs par association) pour un catalogue de
+    'entries' étudiants et autant de photos.
+    """
+    from catalog import PhotoCatalog
+
+    tracemalloc.start()
+    catalog = PhotoCatalog()
+    catalog.set_students([f"Étudiant {i}" for i in range(entries)])
+    for i in range(entries):
+        catalog.add_photo(f"/photos/IMG_{i:06d}.jpg", f"/cache/IMG_{i:06d}_processed.jpg")
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    paths = [photo.processed_path for photo in catalog.photos]
+    start = time.perf_counter()
+    for i, path in enumerate(paths):
+        catalog.assign_name(path, f"Étudiant {(i * 7) % entries}")
+    for path in paths:
+        catalog.unassign_path(path)
+    per_op = (time.perf_counter() - start) * 1e6 / (2 * entries)
+    return memory / entries, per_op
+
+def measure_export(pages):
+    """ Retourne les durées (ms) du premier export et du réexport après une correction. """
+    import tempfile
+    import numpy as np
+    from PIL import Image
+    from utils import WordExporter
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        associations = {}
+        for i in range(pages * 12): # Mise en page 3x4
+            path = os.path.join(tmp, f"{i}.jpg")
+            Image.fromarray(rng.integers(0, 256, (300, 300, 3), dtype=np.uint8)).save(path, quality=70)
+            associations[path] = f"Étudiant {i:05d}"
+        save_path = os.path.join(tmp, "trombinoscope.docx")
+        exporter = WordExporter()
+        start = time.perf_counter()
+        exporter.export(associations, "3x4", save_path)
+        full = (time.perf_counter() - start) * 1000
+        # Corriger un nom au milieu du document (même place dans l'ordre alphabétique)
+        middle = list(associations)[len(associations) // 2]
+        associations[middle] += " (corrigé)"
+        start = time.perf_counter()
+        exporter.export(associations, "3x4", save_path)
+        return full, (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesures de performance de TrombinoApp")
+    subparsers = parser.add_subparsers(dest="bench", required=True)
+    startup = subparsers.add_parser("startup", help="Temps jusqu'à la première fenêtre")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("command", nargs="*", help="Commande à lancer (défaut: python main.py)")
+    normalize = subparsers.add_parser("normalize", help="Coût de l'harmonisation du lot")
+    normalize.add_argument("--images", type=int, default=200)
+    catalog = subparsers.add_parser("catalog", help="Mémoire et coût des associations du catalogue")
+    catalog.add_argument("--entries", type=int, nargs="+", default=[1000, 50000])
+    export = subparsers.add_parser("export", help="Export Word complet et réexport incrémental")
+    export.add_argument("--pages", type=int, default=60)
+    args = parser.parse_args()
+
+    if args.bench == "startup":
+        here = os.path.dirname(os.path.abspath(__file__))
+        command = args.command or [sys.executable, os.path.join(here, "main.py")]
+        external, internal = measure_startup(command, args.runs)
+        if not external:
+            sys.exit(1)
+        print(f"Démarrage ({len(external)} lancements) :")
+        print(f"  depuis le lancement du processus : médiane {statistics.median(external):.0f} ms, "
+              f"min {min(external):.0f} ms")
+        print(f"  depuis le début de main.py       : médiane {statistics.median(internal):.0f} ms, "
+              f"min {min(internal):.0f} ms")
+    elif args.bench == "normalize":
+        per_image = measure_normalize(args.images)
+        print(f"Harmonisation de {args.images} images : {per_image:.2f} ms par image")
+    elif args.bench == "catalog":
+        for entries in args.entries:
+            per_entry, per_op = measure_catalog(entries)
+            print(f"Catalogue de {entries} entrées : {per_entry:.0f} octets par entrée, "
+                  f"{per_op:.2f} µs par opération")
+    elif args.bench == "export":
+        full, incremental = measure_export(args.pages)
+        print(f"Export Word de {args.pages} pages : {full:.0f} ms, "
+              f"réexport après correction d'un nom : {incremental:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Modèle de données central de l'assistant : étudiants, photos et associations.
+
+Remplace les dictionnaires parallèles (liste de noms, {original: traité},
+{traité: nom}) par des enregistrements à identifiants entiers, avec un
+index dans chaque sens (photo -> étudiant et étudiant -> photo) : associer,
+dissocier ou réassigner se fait en temps constant et l'état reste cohérent
+(une photo a au plus un étudiant, un étudiant au plus une photo).
+"""
+
+# Valeur de photo_id / student_id quand il n'y a pas d'association
+UNASSIGNED = -1
+
+class StudentRecord:
+    __slots__ = ('id', 'name', 'photo_id')
+
+    def __init__(self, student_id, name):
+        self.id = student_id
+        self.name = name
+        self.photo_id = UNASSIGNED
+
+class PhotoRecord:
+    __slots__ = ('id', 'original_path', 'processed_path', 'student_id')
+
+    def __init__(self, photo_id, original_path, processed_path):
+        self.id = photo_id
+        self.original_path = original_path
+        self.processed_path = processed_path
+        self.student_id = UNASSIGNED
+
+class PhotoCatalog:
+    """
+    Les vues s'abonnent avec add_listener(callback) ; callback(event, *args)
+    est appelé après chaque changement :
+        'students'              la liste des étudiants a été remplacée
+        'photos_cleared'        toutes les photos ont été retirées
+        'photo_added'           (photo_id)
+        'photo_updated'         (photo_id, ancien processed_path) photo retraitée
+        'assigned'              (photo_id, student_id)
+        'unassigned'            (photo_id, student_id)
+    """
+    def __init__(self):
+        self.students = [] # StudentRecord, indexés par id
+        self.photos = [] # PhotoRecord, indexés par id
+        self._photo_by_processed = {} # {processed_path: photo_id}
+        self._photo_by_original = {} # {original_path: photo_id}
+        self._students_by_name = {} # {name: [student_id, ...]} (doublons possibles)
+        self._assigned_count = 0
+        self._listeners = []
+
+    # --- Notifications ---
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    def _notify(self, event, *args):
+        for callback in list(self._listeners):
+            callback(event, *args)
+
+    # --- Étudiants et photos ---
+
+    def set_students(self, names):
+        """ Remplace la liste des étudiants (les associations sont perdues). """
+        for photo in self.photos:
+            photo.student_id = UNASSIGNED
+        self._assigned_count = 0
+        self.students = [StudentRecord(i, name) for i, name in enumerate(names)]
+        self._students_by_name = {}
+        for student in self.students:
+            self._students_by_name.setdefault(student.name, []).append(student.id)
+        self._notify('students')
+
+    def clear_photos(self):
+        for student in self.students:
+            student.photo_id = UNASSIGNED
+        self._assigned_count = 0
+        self.photos = []
+        self._photo_by_processed = {}
+        self._photo_by_original = {}
+        self._notify('photos_cleared')
+
+    def add_photo(self, original_path, processed_path):
+        """
+        Ajoute une photo traitée et retourne son identifiant, ou None si ce
+        fichier traité appartient déjà à une autre photo d'origine (deux
+        photos écrites au même endroit : une seule a survécu sur le disque).
+        """
+        owner = self._photo_by_processed.get(processed_path)
+        if owner is not None and self.photos[owner].original_path != original_path:
+            print(f"Erreur: {processed_path} est déjà la photo traitée de "
+                  f"{self.photos[owner].original_path}, {original_path} est ignorée.")
+            return None
+        photo_id = self._photo_by_original.get(original_path)
+        if photo_id is not None:
+            # Photo retraitée : garder l'enregistrement (et son association)
+            photo = self.photos[photo_id]
+            previous_path = photo.processed_path
+            del self._photo_by_processed[previous_path]
+            photo.processed_path = processed_path
+            self._photo_by_processed[processed_path] = photo_id
+            self._notify('photo_updated', photo_id, previous_path)
+            return photo_id
+        photo_id = len(self.photos)
+        self.photos.append(PhotoRecord(photo_id, original_path, processed_path))
+        self._photo_by_processed[processed_path] = photo_id
+        self._photo_by_original[original_path] = photo_id
+        self._notify('photo_added', photo_id)
+        return photo_id
+
+    def photo_id(self, processed_path):
+        return self._photo_by_processed.get(processed_path)
+
+    def photo_id_by_original(self, original_path):
+        return self._photo_by_original.get(original_path)
+
+    def student_ids(self, name):
+        return self._students_by_name.get(name, [])
+
+    def student_name(self, photo_id):
+        """ Nom associé à une photo, ou None. """
+        student_id = self.photos[photo_id].student_id
+        return None if student_id == UNASSIGNED else self.students[student_id].name
+
+    # --- Associations ---
+
+    def assign(self, photo_id, student_id):
+        """
+        Associe la photo à l'étudiant. Si la photo avait déjà un étudiant,
+        ou l'étudiant déjà une photo, l'ancienne association est défaite
+        (et notifiée) avant.
+        """
+        photo = self.photos[photo_id]
+        student = self.students[student_id]
+        if photo.student_id == student_id:
+            return
+        if photo.student_id != UNASSIGNED:
+            self.unassign(photo_id)
+        if student.photo_id != UNASSIGNED:
+            self.unassign(student.photo_id)
+        photo.student_id = student_id
+        student.photo_id = photo_id
+        self._assigned_count += 1
+        self._notify('assigned', photo_id, student_id)
+
+    def unassign(self, photo_id):
+        photo = self.photos[photo_id]
+        student_id = photo.student_id
+        if student_id == UNASSIGNED:
+            return
+        photo.student_id = UNASSIGNED
+        self.students[student_id].photo_id = UNASSIGNED
+        self._assigned_count -= 1
+        self._notify('unassigned', photo_id, student_id)
+
+    def assign_name(self, processed_path, name, move=False):
+        """
+        Associe une photo à un étudiant désigné par son nom (glisser-déposer,
+        mode clavier) : un étudiant de ce nom encore libre est choisi. Si tous
+        les étudiants de ce nom ont déjà une photo, rien n'est fait, sauf si
+        'move' est vrai : le premier quitte alors sa photo pour celle-ci.
+        Retourne l'identifiant de l'étudiant, ou None.
+        """
+        photo_id = self._photo_by_processed.get(processed_path)
+        candidates = self._students_by_name.get(name)
+        if photo_id is None or not candidates:
+            return None
+        if self.photos[photo_id].student_id in candidates:
+            return self.photos[photo_id].student_id
+        student_id = next((s for s in candidates if self.students[s].photo_id == UNASSIGNED), None)
+        if student_id is None:
+            if not move:
+                return None
+            student_id = candidates[0]
+        self.assign(photo_id, student_id)
+        return student_id
+
+    def unassign_path(self, processed_path):
+        photo_id = self._photo_by_processed.get(processed_path)
+        if photo_id is not None:
+            self.unassign(photo_id)
+
+    # --- Lecture ---
+
+    def student_count(self):
+        return len(self.students)
+
+    def photo_count(self):
+        return len(self.photos)
+
+    def assigned_count(self):
+        return self._assigned_count
+
+    def free_student_names(self):
+        return [s.name for s in self.students if s.photo_id == UNASSIGNED]
+
+    def associations(self):
+        """ dict {processed_path: student_name}, comme l'attend l'export. """
+        return {photo.processed_path: self.students[photo.student_id].name
+                for photo in self.photos if photo.student_id != UNASSIGNED}
+
+    # --- Sérialisation compacte ---
+
+    def to_dict(self):
+        """
+        Forme compacte, sérialisable en JSON : les noms dans l'ordre des
+        identifiants et, pour chaque photo, [original, traité, student_id].
+        """
+        return {
+            'students': [s.name for s in self.students],
+            'photos': [[p.original_path, p.processed_path, p.student_id] for p in self.photos],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        catalog = cls()
+        catalog.set_students(data.get('students', []))
+        for original_path, processed_path, student_id in data.get('photos', []):
+            photo_id = catalog.add_photo(original_path, processed_path)
+            if photo_id is not None and student_id != UNASSIGNED:
+                catalog.assign(photo_id, student_id)
+        return catalog
@@ -0,0 +1,329 @@
+"""
+Service local de génération de trombinoscopes (bibliothèque standard uniquement).
+
+Permet à plusieurs postes d'envoyer leurs travaux à une seule machine
+puissante au lieu de traiter les photos chacun de leur côté :
+
+    python job_server.py --host 0.0.0.0 --port 8765 --workers 2
+
+Un travail est une archive ZIP envoyée par POST /jobs?layout=4x5 qui contient :
+    mapping.json   {"chemin/de/la/photo.jpg": "Nom Prénom", ...}
+    les photos     aux chemins indiqués dans mapping.json
+    roster.xlsx    (optionnel) la liste Excel : les noms absents de la liste
+                   sont signalés et ses photos insérées sont aussi utilisées
+
+Routes :
+    POST /jobs                   -> 202 {"id": ..., "status_url": ...}
+    GET  /jobs                   -> état de tous les travaux
+    GET  /jobs/<id>              -> état, progression (0-100), erreurs
+    GET  /jobs/<id>/document     -> le fichier .docx une fois terminé
+
+Les photos traitées sont gardées dans un cache partagé entre travaux,
+indexé par le contenu des photos d'origine : une photo déjà envoyée par
+un autre poste n'est pas traitée deux fois.
+"""
+import os
+import re
+import json
+import uuid
+import queue
+import shutil
+import hashlib
+import zipfile
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils import (resize_image, create_word_doc, read_excel, read_excel_photos,
+                   split_archive_member, DecodeScheduler, SUPPORTED_FORMATS)
+
+LAYOUT_PATTERN = re.compile(r'^\d+x\d+$')
+DOCUMENT_NAME = 'trombinoscope.docx'
+DOCX_MIME = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+class Job:
+    """ Un travail de génération et son état (lu par les requêtes GET). """
+    def __init__(self, job_id, layout, job_dir):
+        self.id = job_id
+        self.layout = layout
+        self.job_dir = job_dir
+        self.state = 'queued' # queued, running, done, failed
+        self.photos_total = 0
+        self.photos_done = 0
+        self.cache_hits = 0
+        self.warnings = []
+        self.error = None
+
+    @property
+    def archive_path(self):
+        return os.path.join(self.job_dir, 'job.zip')
+
+    @property
+    def document_path(self):
+        return os.path.join(self.job_dir, DOCUMENT_NAME)
+
+    def progress(self):
+        if self.state == 'done':
+            return 100
+        if not self.photos_total:
+            return 0
+        # Les photos comptent pour 90 %, l'export Word pour le reste
+        return int(self.photos_done * 90 / self.photos_total)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'state': self.state,
+            'layout': self.layout,
+            'progress': self.progress(),
+            'photos_total': self.photos_total,
+            'photos_done': self.photos_done,
+            'cache_hits': self.cache_hits,
+            'warnings': self.warnings,
+            'error': self.error,
+            'document_url': f"/jobs/{self.id}/document" if self.state == 'done' else None,
+        }
+
+class JobServer:
+    """
+    File de travaux, traitée par 'workers' threads ; toutes les photos
+    passent par un pool commun de threads de traitement et un budget
+    mémoire de décodage commun.
+    """
+    def __init__(self, data_dir, workers=2, photo_workers=None):
+        self.data_dir = data_dir
+        self.cache_dir = os.path.join(data_dir, 'cache')
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.photo_workers = photo_workers or os.cpu_count() or 1
+        self.photo_pool = ThreadPoolExecutor(max_workers=self.photo_workers)
+        self.scheduler = DecodeScheduler()
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, layout, body, length):
+        """ Enregistre l'archive envoyée et met le travail en file d'attente. """
+        job_id = uuid.uuid4().hex[:12]
+        job = Job(job_id, layout, os.path.join(self.data_dir, 'jobs', job_id))
+        os.makedirs(job.job_dir)
+        with open(job.archive_path, 'wb') as f:
+            remaining = length
+            while remaining > 0:
+                chunk = body.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+        with self.lock:
+            self.jobs[job_id] = job
+        self.queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def all_jobs(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            job.state = 'running'
+            try:
+                self._run(job)
+                job.state = 'done'
+            except Exception as e:
+                print(f"Erreur travail {job.id}: {e}")
+                job.error = str(e)
+                job.state = 'failed'
+
+    def _run(self, job):
+        with zipfile.ZipFile(job.archive_path) as archive:
+            members = set(archive.namelist())
+            if 'mapping.json' not in members:
+                raise ValueError("mapping.json absent de l'archive")
+            mapping = json.loads(archive.read('mapping.json').decode('utf-8'))
+            if not isinstance(mapping, dict):
+                raise ValueError("mapping.json doit associer chaque photo à un nom")
+
+            # Les photos du client ne peuvent être que des fichiers de l'archive
+            # envoyée : un chemin "archive.zip!/photo" n'est pas résolu (il
+            # désignerait un fichier du serveur)
+            for photo in mapping:
+                if photo not in members:
+                    raise ValueError(f"Photo absente de l'archive : {photo}")
+
+            # Liste Excel (optionnelle) : contrôle des noms et photos insérées,
+            # lues dans la copie du classeur propre à ce travail
+            roster_mapping = {}
+            if 'roster.xlsx' in members:
+                roster_path = os.path.join(job.job_dir, 'roster.xlsx')
+                with archive.open('roster.xlsx') as src, open(roster_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                roster = set(read_excel(roster_path) or [])
+                for photo, name in mapping.items():
+                    if name not in roster:
+                        job.warnings.append(f"{name} ({photo}) n'est pas dans la liste Excel")
+                mapped_names = set(mapping.values())
+                for photo, name in read_excel_photos(roster_path).items():
+                    xlsx_path, member = split_archive_member(photo)
+                    if xlsx_path == roster_path and name not in mapped_names:
+                        roster_mapping[member] = name
+
+            job.photos_total = len(mapping) + len(roster_mapping)
+            photos = [(archive, photo, name) for photo, name in mapping.items()]
+            roster_archive = zipfile.ZipFile(roster_path) if roster_mapping else None
+            try:
+                photos += [(roster_archive, member, name) for member, name in roster_mapping.items()]
+                associations = self._process_photos(job, photos)
+            finally:
+                if roster_archive is not None:
+                    roster_archive.close()
+
+        if not associations:
+            raise ValueError("Aucune photo n'a pu être traitée")
+        if not create_word_doc(associations, job.layout, job.document_path):
+            raise ValueError("Erreur lors de la création du fichier Word")
+
+    def _process_photos(self, job, photos):
+        """
+        Lit chaque photo dans le thread du travail (une archive ZIP ne se lit
+        pas depuis plusieurs threads à la fois) et envoie les photos absentes
+        du cache au pool commun, avec un nombre limité de tâches en attente.
+        'photos' est une liste de (archive ZIP ouverte, nom du fichier, nom).
+        Retourne {chemin traité dans le cache: nom}.
+        """
+        tmp_dir = os.path.join(job.job_dir, 'tmp')
+        associations = {}
+        pending = {}
+
+        def collect(done):
+            for future in done:
+                name = pending.pop(future)
+                processed_path = future.result()
+                if processed_path:
+                    associations[processed_path] = name
+                else:
+                    job.warnings.append(f"Photo illisible pour {name}")
+                job.photos_done += 1
+
+        for archive, photo, name in photos:
+            ext = os.path.splitext(photo)[1].lower()
+            if ext not in SUPPORTED_FORMATS:
+                job.warnings.append(f"Format non supporté : {photo}")
+                job.photos_done += 1
+                continue
+            data = archive.read(photo)
+            key = hashlib.sha1(data).hexdigest()
+            cached = self._cached(key)
+            if cached:
+                associations[cached] = name
+                job.cache_hits += 1
+                job.photos_done += 1
+                continue
+            while len(pending) >= self.photo_workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = self.photo_pool.submit(self._process_photo, key, ext, data, tmp_dir)
+            pending[future] = name
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+        return associations
+
+    def _cached(self, key):
+        for ext in ('.jpg', '.png'):
+            path = os.path.join(self.cache_dir, f"{key}_processed{ext}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _process_photo(self, key, ext, data, tmp_dir):
+        # Nommer la photo d'après son contenu : le fichier traité est déplacé
+        # d'un bloc dans le cache sous le nom "<empreinte>_processed.jpg"
+        processed_path = resize_image(key + ext, tmp_dir, data=data, scheduler=self.scheduler)
+        if not processed_path:
+            return None
+        cached_path = os.path.join(self.cache_dir, f"{key}_processed{os.path.splitext(processed_path)[1]}")
+        os.replace(processed_path, cached_path)
+        return cached_path
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    server_version = "TrombinoJobServer/1.0"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip('/') != '/jobs':
+            return self._send_json(404, {'error': 'Route inconnue'})
+        layout = parse_qs(url.query).get('layout', ['3x4'])[0]
+        if not LAYOUT_PATTERN.match(layout):
+            return self._send_json(400, {'error': f"Mise en page invalide : {layout} (ex: 3x4)"})
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return self._send_json(400, {'error': "Archive ZIP du travail manquante"})
+        job = self.server.jobs.submit(layout, self.rfile, length)
+        self._send_json(202, {'id': job.id, 'status_url': f"/jobs/{job.id}"})
+
+    def do_GET(self):
+        parts = [p for p in urlparse(self.path).path.split('/') if p]
+        if parts == ['jobs']:
+            return self._send_json(200, [job.to_dict() for job in self.server.jobs.all_jobs()])
+        if len(parts) not in (2, 3) or parts[0] != 'jobs':
+            return self._send_json(404, {'error': 'Route inconnue'})
+        job = self.server.jobs.get(parts[1])
+        if job is None:
+            return self._send_json(404, {'error': 'Travail inconnu'})
+        if len(parts) == 2:
+            return self._send_json(200, job.to_dict())
+        if parts[2] != 'document':
+            return self._send_json(404, {'error': 'Route inconnue'})
+        if job.state != 'done':
+            return self._send_json(409, {'error': "Le document n'est pas prêt", 'state': job.state})
+        with open(job.document_path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', DOCX_MIME)
+        self.send_header('Content-Disposition', f'attachment; filename="{DOCUMENT_NAME}"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def make_server(host='127.0.0.1', port=8765, workers=2, data_dir=None):
+    """ Crée le serveur HTTP (port=0 : port libre choisi par le système). """
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), "TrombinoJobServer")
+    server = ThreadingHTTPServer((host, port), JobRequestHandler)
+    server.jobs = JobServer(data_dir, workers=workers)
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Service local de génération de trombinoscopes")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse d'écoute (0.0.0.0 pour le réseau local)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="Travaux traités en parallèle")
+    parser.add_argument("--data-dir", help="Dossier des travaux et du cache de photos")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.workers, args.data_dir)
+    print(f"Service de trombinoscopes sur http://{args.host}:{server.server_address[1]}/jobs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
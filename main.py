@@ -1,7 +1,28 @@
+import time
+STARTUP_TIME = time.perf_counter() # Avant tout import lourd
+
 import sys
+import threading
 from PySide6.QtWidgets import QApplication
 from PySide6.QtGui import QFont
+from PySide6.QtCore import QTimer
 from app_wizard import TrombinoscopeWizard
+from utils import warm_up_modules
+
+# Avec --startup-benchmark, affiche le temps jusqu'à la première fenêtre
+# puis quitte (utilisé par bench.py)
+STARTUP_BENCHMARK_FLAG = "--startup-benchmark"
+
+def onFirstWindowShown():
+    """ Appelée par la boucle d'événements juste après le premier affichage. """
+    if STARTUP_BENCHMARK_FLAG in sys.argv:
+        elapsed_ms = (time.perf_counter() - STARTUP_TIME) * 1000
+        print(f"time_to_first_window_ms={elapsed_ms:.1f} epoch={time.time():.6f}", flush=True)
+        QApplication.instance().quit()
+        return
+    # Précharger Pillow, openpyxl et python-docx pendant que l'utilisateur
+    # remplit la première page
+    threading.Thread(target=warm_up_modules, daemon=True).start()
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -83,5 +104,6 @@ if __name__ == "__main__":
     wizard.resize(1000, 700)
     
     wizard.show()
+    QTimer.singleShot(0, onFirstWindowShown)
     
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
@@ -0,0 +1,117 @@
+"""
+Tests du service de génération (job_server.py), entièrement sur localhost :
+
+    python -m unittest test_job_server
+"""
+import io
+import os
+import json
+import time
+import shutil
+import zipfile
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from PIL import Image
+
+import job_server
+
+def jpeg_bytes(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (400, 300), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+def job_archive(mapping, photos):
+    """ Archive d'un travail : mapping.json et les photos {nom dans l'archive: octets}. """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in photos.items():
+            archive.writestr(name, data)
+        archive.writestr('mapping.json', json.dumps(mapping))
+    return buffer.getvalue()
+
+class JobServerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.server = job_server.make_server(port=0, workers=1, data_dir=os.path.join(self.tmp, 'data'))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def post(self, body, layout='3x4'):
+        request = urllib.request.Request(f"{self.base}/jobs?layout={layout}", data=body, method='POST',
+                                         headers={'Content-Type': 'application/zip'})
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+
+    def get_json(self, path):
+        with urllib.request.urlopen(self.base + path) as response:
+            return json.load(response)
+
+    def wait_for(self, job):
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            status = self.get_json(job['status_url'])
+            if status['state'] in ('done', 'failed'):
+                return status
+            time.sleep(0.05)
+        self.fail("Le travail ne s'est pas terminé")
+
+    def test_job_produces_document(self):
+        photos = {'classe/a.jpg': jpeg_bytes((255, 0, 0)), 'classe/b.jpg': jpeg_bytes((0, 0, 255))}
+        code, job = self.post(job_archive({'classe/a.jpg': 'Alice', 'classe/b.jpg': 'Bob'}, photos))
+        self.assertEqual(code, 202)
+
+        status = self.wait_for(job)
+        self.assertEqual(status['state'], 'done', status)
+        self.assertEqual(status['progress'], 100)
+        self.assertEqual(status['photos_done'], 2)
+        self.assertIn(job['id'], [j['id'] for j in self.get_json('/jobs')])
+
+        with urllib.request.urlopen(self.base + status['document_url']) as response:
+            document = response.read()
+        with zipfile.ZipFile(io.BytesIO(document)) as docx:
+            media = [name for name in docx.namelist() if name.startswith('word/media/')]
+            body = docx.read('word/document.xml').decode('utf-8')
+        self.assertEqual(len(media), 2)
+        self.assertIn('Alice', body)
+        self.assertIn('Bob', body)
+
+        # Même contenu envoyé à nouveau : photos reprises du cache
+        _, job = self.post(job_archive({'classe/a.jpg': 'Alice', 'classe/b.jpg': 'Bob'}, photos))
+        self.assertEqual(self.wait_for(job)['cache_hits'], 2)
+
+    def test_missing_photo_fails(self):
+        _, job = self.post(job_archive({'absente.jpg': 'Alice'}, {}))
+        status = self.wait_for(job)
+        self.assertEqual(status['state'], 'failed')
+        self.assertIn('absente.jpg', status['error'])
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{self.base}/jobs/{job['id']}/document")
+        self.assertEqual(error.exception.code, 409)
+
+    def test_server_paths_are_rejected(self):
+        # Une archive présente sur le serveur mais jamais envoyée
+        secret = os.path.join(self.tmp, 'secret.zip')
+        with zipfile.ZipFile(secret, 'w') as archive:
+            archive.writestr('s.jpg', jpeg_bytes((0, 255, 0)))
+        for photo in (f"{secret}!/s.jpg", 'photos.zip!/a.jpg'):
+            _, job = self.post(job_archive({photo: 'Intrus'}, {'photos.zip': b''}))
+            status = self.wait_for(job)
+            self.assertEqual(status['state'], 'failed', photo)
+            self.assertEqual(status['photos_done'], 0)
+
+    def test_invalid_layout(self):
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            self.post(job_archive({}, {}), layout='abc')
+        self.assertEqual(error.exception.code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
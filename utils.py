@@ -1,93 +1,888 @@
 import sys
 import os
-from PIL import Image, ImageOps
-from openpyxl import load_workbook
-from docx import Document
-from docx.shared import Inches, Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+import io
+import re
+import html
+import json
+import glob
+import shutil
+import hashlib
+import platform
+import posixpath
+import importlib
+import importlib.util
+import threading
+import unicodedata
+import zipfile
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from xml.etree import ElementTree
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Pillow, openpyxl et python-docx sont importés dans les fonctions qui les
+# utilisent : ils ne sont chargés qu'au premier traitement / import / export,
+# pour que la fenêtre de l'assistant s'affiche sans les attendre.
+
+# Modules lourds préchargés en arrière-plan après l'affichage de la fenêtre
+WARM_UP_MODULES = ('PIL.Image', 'PIL.ImageOps', 'openpyxl', 'docx')
+
+def warm_up_modules():
+    """
+    Importe les modules lourds pour que la première utilisation soit rapide.
+    Prévue pour tourner dans un thread en arrière-plan ; une erreur
+    d'import sera de toute façon signalée à la première vraie utilisation.
+    """
+    for name in WARM_UP_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"Erreur préchargement {name}: {e}")
 
 # --- 1. Traitement d'Images (Pillow) ---
 
 SUPPORTED_FORMATS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff')
+# Archives dont les photos sont lues directement, sans extraction sur disque
+ARCHIVE_FORMATS = ('.zip',)
+# Sépare le chemin d'une archive de celui d'un fichier qu'elle contient :
+# "photos.zip!/classe/IMG_0001.jpg"
+ARCHIVE_MEMBER_SEP = '!/'
+# Fichiers ZIP dont on peut lire une photo par son chemin (le classeur
+# .xlsx est un ZIP : voir read_excel_photos)
+_ZIP_CONTAINERS = ARCHIVE_FORMATS + ('.xlsx',)
+
+def archive_member_path(archive_path, member):
+    return f"{archive_path}{ARCHIVE_MEMBER_SEP}{member}"
+
+def split_archive_member(path):
+    """
+    Retourne (chemin de l'archive, nom du fichier dans l'archive) pour un
+    chemin créé par archive_member_path, ou (None, path) sinon.
+    """
+    lower = path.lower()
+    for ext in _ZIP_CONTAINERS:
+        index = lower.find(ext + ARCHIVE_MEMBER_SEP)
+        if index != -1:
+            end = index + len(ext)
+            return path[:end], path[end + len(ARCHIVE_MEMBER_SEP):]
+    return None, path
+
+def list_archive_photos(archive_path):
+    """ Liste les photos d'une archive ZIP (sans rien extraire). """
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            members = [info.filename for info in archive.infolist()
+                       if not info.is_dir()
+                       and os.path.splitext(info.filename)[1].lower() in SUPPORTED_FORMATS
+                       # Ignorer les métadonnées ajoutées par macOS
+                       and not info.filename.startswith('__MACOSX/')
+                       and not os.path.basename(info.filename).startswith('._')]
+        return [archive_member_path(archive_path, member) for member in sorted(members)]
+    except (OSError, zipfile.BadZipFile) as e:
+        print(f"Erreur lecture archive {archive_path}: {e}")
+        return []
+
+def expand_photo_sources(paths):
+    """
+    Transforme une liste de fichiers déposés en liste de photos à traiter :
+    les formats non supportés sont ignorés, chaque archive ZIP est
+    remplacée par les photos qu'elle contient et chaque dossier par les
+    photos (et archives) qu'il contient, sous-dossiers compris.
+    """
+    photo_paths = []
+    for path in paths:
+        ext = os.path.splitext(path)[1].lower()
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                photo_paths.extend(expand_photo_sources(
+                    [os.path.join(root, name) for name in sorted(files) if not name.startswith('.')]))
+        elif ext in ARCHIVE_FORMATS:
+            photo_paths.extend(list_archive_photos(path))
+        elif ext in SUPPORTED_FORMATS:
+            photo_paths.append(path)
+    return photo_paths
+
+# --- Mesures du traitement (télémétrie) ---
+
+# Étapes chronométrées, par photo, dans l'ordre du traitement
+PIPELINE_STAGES = ('read', 'wait', 'decode', 'crop', 'normalize', 'encode', 'write', 'thumbnail')
+# Fenêtre (secondes) du débit glissant et nombre d'échantillons récents
+# par étape pour les percentiles affichés pendant le traitement
+METRICS_WINDOW = 5.0
+METRICS_RECENT_SAMPLES = 500
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+class PipelineMetrics:
+    """
+    Mesures d'un import de photos, alimentées par les threads du traitement
+    (voir process_photos) : durée de chaque étape pour chaque photo, octets
+    lus et écrits, photos terminées. snapshot() donne l'état courant (débit
+    glissant, p50/p95 récents par étape, temps restant estimé) et write()
+    enregistre le bilan complet de l'import dans un fichier JSON, pour
+    comparer des machines entre elles.
+    """
+    def __init__(self, total=0):
+        self.total = total
+        self.settings = {} # Réglages du traitement (workers, budget...)
+        self.started = time.perf_counter()
+        self.done = 0
+        self.failed = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._samples = {stage: array('d') for stage in PIPELINE_STAGES}
+        self._recent = {stage: deque(maxlen=METRICS_RECENT_SAMPLES) for stage in PIPELINE_STAGES}
+        self._completions = deque() # Instants de fin des photos dans la fenêtre glissante
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._samples[stage].append(seconds)
+            self._recent[stage].append(seconds)
+
+    def add_bytes(self, read=0, written=0):
+        with self._lock:
+            self.bytes_read += read
+            self.bytes_written += written
+
+    def image_done(self, success):
+        now = time.perf_counter()
+        with self._lock:
+            self.done += 1
+            if not success:
+                self.failed += 1
+            self._completions.append(now)
+            while now - self._completions[0] > METRICS_WINDOW:
+                self._completions.popleft()
+
+    def _rate(self, now):
+        # Débit sur la fenêtre glissante (ou depuis le début si plus court)
+        while self._completions and now - self._completions[0] > METRICS_WINDOW:
+            self._completions.popleft()
+        span = min(METRICS_WINDOW, now - self.started)
+        return len(self._completions) / span if span > 0 else 0.0
+
+    def snapshot(self):
+        """ État courant, sérialisable en JSON (durées en millisecondes). """
+        now = time.perf_counter()
+        with self._lock:
+            rate = self._rate(now)
+            stages = {}
+            for stage, recent in self._recent.items():
+                if recent:
+                    values = sorted(recent)
+                    stages[stage] = {'p50_ms': _percentile(values, 0.5) * 1000,
+                                     'p95_ms': _percentile(values, 0.95) * 1000}
+            remaining = max(0, self.total - self.done)
+            return {
+                'done': self.done,
+                'total': self.total,
+                'failed': self.failed,
+                'elapsed_s': now - self.started,
+                'images_per_s': rate,
+                'eta_s': remaining / rate if rate else None,
+                'bytes_read': self.bytes_read,
+                'bytes_written': self.bytes_written,
+                'stages': stages,
+            }
+
+    def summary(self):
+        """ Bilan de tout l'import : percentiles sur toutes les photos. """
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            stages = {}
+            for stage, samples in self._samples.items():
+                if samples:
+                    values = sorted(samples)
+                    stages[stage] = {
+                        'count': len(values),
+                        'mean_ms': sum(values) / len(values) * 1000,
+                        'p50_ms': _percentile(values, 0.5) * 1000,
+                        'p95_ms': _percentile(values, 0.95) * 1000,
+                        'max_ms': values[-1] * 1000,
+                        'total_s': sum(values),
+                    }
+            return {
+                'total': self.total,
+                'done': self.done,
+                'failed': self.failed,
+                'elapsed_s': elapsed,
+                'images_per_s': self.done / elapsed if elapsed > 0 else 0.0,
+                'bytes_read': self.bytes_read,
+                'bytes_written': self.bytes_written,
+                'stages': stages,
+            }
+
+    def write(self, path):
+        """ Enregistre le bilan, les réglages et la machine ; retourne True si réussi. """
+        try:
+            from PIL import __version__ as pillow_version
+            report = {
+                'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'machine': {
+                    'platform': platform.platform(),
+                    'processor': platform.processor() or platform.machine(),
+                    'cpu_count': os.cpu_count(),
+                    'python': platform.python_version(),
+                    'pillow': pillow_version,
+                },
+                'settings': self.settings,
+                **self.summary(),
+            }
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            return True
+        except Exception as e:
+            print(f"Erreur écriture des mesures {path}: {e}")
+            return False
 
-def resize_image(input_path, output_dir, max_size_kb=200):
+@contextmanager
+def _timed(metrics, stage):
+    """ Chronomètre une étape si des mesures sont demandées. """
+    if metrics is None:
+        yield
+    else:
+        with metrics.stage(stage):
+            yield
+
+# Valeur "nice" des threads d'un traitement en priorité basse (Linux)
+LOW_PRIORITY_NICE = 10
+# THREAD_PRIORITY_LOWEST de l'API Windows
+_WINDOWS_LOWEST_PRIORITY = -2
+
+def lower_thread_priority():
+    """
+    Baisse la priorité du thread appelant. Les threads Python n'héritent pas
+    de la priorité du QThread qui les lance : les threads qui font le vrai
+    travail d'un traitement en priorité basse l'appellent eux-mêmes.
+    Linux : "nice" propre au thread ; Windows : SetThreadPriority ; sans
+    effet ailleurs. Une priorité baissée ne peut pas être remontée sans
+    droits particuliers : un traitement à accélérer est relancé dans de
+    nouveaux threads.
+    """
+    try:
+        if sys.platform.startswith('linux'):
+            thread_id = threading.get_native_id()
+            nice = max(os.getpriority(os.PRIO_PROCESS, thread_id), LOW_PRIORITY_NICE)
+            os.setpriority(os.PRIO_PROCESS, thread_id, nice)
+        elif sys.platform == 'win32':
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), _WINDOWS_LOWEST_PRIORITY)
+    except (OSError, AttributeError) as e:
+        print(f"Priorité du thread inchangée: {e}")
+
+# Budget mémoire de la lecture anticipée (octets bruts en attente de décodage)
+PREFETCH_BUDGET_BYTES = 64 * 1024 * 1024
+
+class PhotoPrefetcher:
+    """
+    Lit à l'avance le contenu des prochains fichiers dans une file bornée
+    par un budget mémoire, pendant que les images précédentes sont décodées.
+    Utile quand les photos sont sur une clé USB ou un partage réseau :
+    les lectures disque et le traitement CPU se recouvrent.
+
+    Les photos contenues dans une archive (voir archive_member_path) sont
+    décompressées directement en mémoire.
+
+    S'itère en (chemin, octets) dans l'ordre des chemins ; octets vaut None
+    si la lecture a échoué. Si 'metrics' (PipelineMetrics) est fourni, la
+    durée et le volume de chaque lecture y sont comptés. Si 'cancel'
+    (threading.Event) est levé, la lecture et l'itération s'arrêtent.
+    """
+    def __init__(self, paths, budget_bytes=PREFETCH_BUDGET_BYTES, metrics=None, cancel=None,
+                 low_priority=False):
+        self.paths = list(paths)
+        self.budget_bytes = budget_bytes
+        self.metrics = metrics
+        self.cancel = cancel
+        self.low_priority = low_priority # Voir lower_thread_priority
+        self._queue = deque()
+        self._queued_bytes = 0
+        self._done = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._archives = {} # Archives ouvertes, utilisées par ce seul thread
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _read(self, path):
+        try:
+            archive_path, member = split_archive_member(path)
+            if archive_path is None:
+                with open(path, 'rb') as f:
+                    return f.read()
+            if archive_path not in self._archives:
+                self._archives[archive_path] = zipfile.ZipFile(archive_path)
+            return self._archives[archive_path].read(member)
+        except (OSError, KeyError, zipfile.BadZipFile) as e:
+            print(f"Erreur lecture {path}: {e}")
+            return None
+
+    def _run(self):
+        if self.low_priority:
+            lower_thread_priority()
+        try:
+            for path in self.paths:
+                if self.cancel is not None and self.cancel.is_set():
+                    return
+                with _timed(self.metrics, 'read'):
+                    data = self._read(path)
+                size = len(data) if data else 0
+                if self.metrics is not None:
+                    self.metrics.add_bytes(read=size)
+                with self._cond:
+                    # Attendre de la place, mais toujours accepter un fichier
+                    # si la file est vide (sinon un gros fichier bloquerait tout)
+                    while (not self._closed and self._queue
+                           and self._queued_bytes + size > self.budget_bytes):
+                        self._cond.wait()
+                    if self._closed:
+                        return
+                    self._queue.append((path, data))
+                    self._queued_bytes += size
+                    self._cond.notify_all()
+        finally:
+            for archive in self._archives.values():
+                archive.close()
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def __iter__(self):
+        while self.cancel is None or not self.cancel.is_set():
+            with self._cond:
+                while not self._queue and not self._done:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                path, data = self._queue.popleft()
+                self._queued_bytes -= len(data) if data else 0
+                self._cond.notify_all()
+            yield path, data
+
+    def close(self):
+        """ Arrête la lecture anticipée et libère les tampons en attente. """
+        with self._cond:
+            self._closed = True
+            self._queue.clear()
+            self._queued_bytes = 0
+            self._cond.notify_all()
+
+# Budget mémoire des images décodées simultanément (pixels en RAM)
+DECODE_BUDGET_BYTES = 512 * 1024 * 1024
+# Taille minimale demandée au décodage réduit des images trop grandes
+REDUCED_DECODE_SIZE = 1200
+
+def estimate_decode_bytes(img):
+    """
+    Estime la mémoire nécessaire pour décoder une image, à partir de son
+    en-tête seulement (Image.open ne décode pas les pixels).
+    """
+    width, height = img.size
+    if img.mode in ('1', 'L', 'P'):
+        bytes_per_pixel = 1
+    elif img.mode.startswith('I;16'):
+        bytes_per_pixel = 2
+    else:
+        # Pillow stocke RGB, RGBA, CMYK, I et F sur 4 octets par pixel
+        bytes_per_pixel = 4
+    # x2 : l'image décodée plus la copie faite par la rotation / le rognage
+    return width * height * bytes_per_pixel * 2
+
+class DecodeScheduler:
+    """
+    N'autorise le décodage simultané de plusieurs images que tant que leur
+    mémoire estimée tient dans budget_bytes. Une image plus grosse que le
+    budget entier est décodée seule.
+    """
+    def __init__(self, budget_bytes=DECODE_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def admit(self, cost):
+        cost = min(cost, self.budget_bytes)
+        with self._cond:
+            while self._in_use and self._in_use + cost > self.budget_bytes:
+                self._cond.wait()
+            self._in_use += cost
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_use -= cost
+                self._cond.notify_all()
+
+def _reduce_oversized(img):
+    """
+    Chemin de décodage réduit pour les images qui dépassent le budget :
+    le JPEG est décodé directement à une échelle réduite (1/2, 1/4, 1/8),
+    sans jamais matérialiser l'image pleine résolution.
+    Les autres formats n'ont pas de décodage partiel dans Pillow : ils
+    restent en pleine taille et sont décodés seuls (voir DecodeScheduler).
+    """
+    mode = img.mode if img.mode in ('RGB', 'L') else 'RGB'
+    img.draft(mode, (REDUCED_DECODE_SIZE, REDUCED_DECODE_SIZE))
+    return img
+
+def processed_output_path(input_path, output_dir, ext):
+    """
+    Chemin du fichier traité d'une photo : "<empreinte>_<nom>_processed<ext>".
+    L'empreinte courte du chemin original complet (membre d'archive compris)
+    distingue les photos de même nom venues de dossiers, d'archives ou de
+    sous-dossiers d'archive différents ("3A/IMG_0001.jpg", "3B/IMG_0001.jpg").
+    """
+    key = hashlib.sha1(input_path.encode('utf-8')).hexdigest()[:10]
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, f"{key}_{base_name}_processed{ext}")
+
+def resize_image(input_path, output_dir, max_size_kb=200, data=None, scheduler=None):
     """
     Redimensionne une image pour qu'elle pèse moins de max_size_kb.
     Gère plusieurs formats et préserve la transparence (PNG).
+    Si 'data' est fourni (octets déjà lus, ex: par PhotoPrefetcher),
+    l'image est décodée depuis la mémoire au lieu de relire input_path.
+    Si 'scheduler' (DecodeScheduler) est fourni, le décodage attend que
+    la mémoire estimée de l'image tienne dans son budget.
     """
     try:
-        # Créer le dossier de sortie s'il n'existe pas
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Définir le chemin de sortie
-        filename = os.path.basename(input_path)
-        base_name, ext = os.path.splitext(filename)
-        # Nous convertissons en JPEG pour un contrôle de qualité, sauf si c'est un PNG
-        output_format = 'PNG' if ext.lower() == '.png' else 'JPEG'
-        output_ext = '.png' if output_format == 'PNG' else '.jpg'
-        output_path = os.path.join(output_dir, f"{base_name}_processed{output_ext}")
-        # Définir les dimensions cibles pour le "crop" (format carré)
-        TARGET_DIMENSIONS = (300, 300)
-
-        with Image.open(input_path) as img:
-            # Corriger l'orientation EXIF si présente
-            img = ImageOps.exif_transpose(img)
-
-            # On rogne l'image par le centre pour qu'elle s'adapte
-            # parfaitement aux dimensions cibles (ex: 300x300)
-            img = ImageOps.fit(
-                img, 
-                TARGET_DIMENSIONS, 
-                Image.LANCZOS, 
-                centering=(0.5, 0.5) # Centrer le crop
-            )
-            
-            # Si l'image a un canal Alpha (transparence), la garder en PNG
-            if img.mode in ('RGBA', 'LA') or 'transparency' in img.info:
-                output_format = 'PNG'
-                output_ext = '.png'
-                output_path = os.path.join(output_dir, f"{base_name}_processed.png")
+        return _resize_image(input_path, output_dir, max_size_kb, data, scheduler)[0]
+    except Exception as e:
+        print(f"Erreur redimensionnement {input_path}: {e}")
+        return None
+
+def _resize_image(input_path, output_dir, max_size_kb, data, scheduler, metrics=None):
+    """
+    Corps de resize_image : retourne (chemin traité, image finale 300x300)
+    et laisse remonter les erreurs. 'metrics' : voir PipelineMetrics.
+    """
+    passthrough = _passthrough_compliant(input_path, output_dir, max_size_kb, data, metrics)
+    if passthrough:
+        return passthrough
+    img = _load_fitted(input_path, data, scheduler, metrics=metrics)
+    return _encode_fitted(img, input_path, output_dir, max_size_kb, metrics)
+
+# Écart toléré (en pixels) autour de 300x300 pour reprendre un JPEG tel quel
+PASSTHROUGH_TOLERANCE = 15
+
+def _passthrough_compliant(input_path, output_dir, max_size_kb, data, metrics=None):
+    """
+    Chemin rapide pour les photos déjà conformes (ex: photos déjà exportées
+    par l'application) : JPEG carré de 300x300 environ, sans rotation EXIF
+    à appliquer et pesant moins de max_size_kb. Leurs octets sont copiés
+    tels quels, sans décodage ni ré-encodage (pas de perte de qualité).
+    Le contrôle se fait sur la taille du fichier et l'en-tête seulement.
+    Retourne (chemin traité, image non décodée) ou None si la photo doit
+    passer par le traitement complet.
+    """
+    from PIL import Image
+
+    if data is None:
+        if split_archive_member(input_path)[0] is not None:
+            return None
+        if os.path.getsize(input_path) > max_size_kb * 1024:
+            return None
+        with _timed(metrics, 'read'), open(input_path, 'rb') as f:
+            data = f.read()
+        if metrics is not None:
+            metrics.add_bytes(read=len(data))
+    if len(data) > max_size_kb * 1024:
+        return None
+
+    img = Image.open(io.BytesIO(data))
+    width, height = img.size
+    if (img.format != 'JPEG' or img.mode not in ('RGB', 'L') or width != height
+            or abs(width - 300) > PASSTHROUGH_TOLERANCE):
+        return None
+    # Pillow ne sait pas tourner un JPEG sans le ré-encoder : une photo
+    # à réorienter passe par le traitement complet
+    if img.getexif().get(0x0112, 1) != 1:
+        return None
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = processed_output_path(input_path, output_dir, '.jpg')
+    with _timed(metrics, 'write'), open(output_path, 'wb') as f:
+        f.write(data)
+    if metrics is not None:
+        metrics.add_bytes(written=len(data))
+    # Si une miniature est demandée, la décoder à échelle réduite suffit
+    img.draft('RGB', (img.width // 2, img.height // 2))
+    return output_path, img
+
+def _load_fitted(input_path, data, scheduler, to_srgb=False, metrics=None):
+    """
+    Décode l'image et la rogne au format carré 300x300.
+    Si to_srgb est vrai, les couleurs sont converties dans l'espace sRGB
+    selon le profil ICC de l'image (s'il y en a un).
+    Étapes mesurées : attente du budget mémoire, décodage, rognage.
+    """
+    from PIL import Image, ImageOps
+
+    # Définir les dimensions cibles pour le "crop" (format carré)
+    TARGET_DIMENSIONS = (300, 300)
+
+    source = io.BytesIO(data) if data is not None else input_path
+    if scheduler is None:
+        scheduler = DecodeScheduler()
+
+    with Image.open(source) as img:
+        # Lire l'en-tête pour estimer la mémoire avant de décoder
+        cost = estimate_decode_bytes(img)
+        if cost > scheduler.budget_bytes:
+            img = _reduce_oversized(img)
+            cost = estimate_decode_bytes(img)
+
+        wait_start = time.perf_counter()
+        with scheduler.admit(cost):
+            if metrics is not None:
+                metrics.record('wait', time.perf_counter() - wait_start)
+            with _timed(metrics, 'decode'):
+                img.load()
+
+            with _timed(metrics, 'crop'):
+                # Corriger l'orientation EXIF si présente
+                img = ImageOps.exif_transpose(img)
+
+                # On rogne l'image par le centre pour qu'elle s'adapte
+                # parfaitement aux dimensions cibles (ex: 300x300)
+                img = ImageOps.fit(
+                    img, 
+                    TARGET_DIMENSIONS, 
+                    Image.LANCZOS, 
+                    centering=(0.5, 0.5) # Centrer le crop
+                )
+
+    if to_srgb and img.info.get('icc_profile'):
+        with _timed(metrics, 'crop'):
+            img = _convert_to_srgb(img)
+    return img
+
+def _encode_fitted(img, input_path, output_dir, max_size_kb, metrics=None):
+    """
+    Encode l'image rognée (JPEG, ou PNG si elle a de la transparence) en
+    réduisant la qualité jusqu'à peser moins de max_size_kb.
+    Retourne (chemin traité, image encodée).
+    """
+    from PIL import Image
+
+    # Créer le dossier de sortie s'il n'existe pas
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Si l'image a un canal Alpha (transparence), la garder en PNG
+    if img.mode in ('RGBA', 'LA') or 'transparency' in img.info:
+        output_format = 'PNG'
+        output_path = processed_output_path(input_path, output_dir, '.png')
+    else:
+        # Convertir en RGB si nécessaire (pour JPEG)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        output_format = 'JPEG'
+        output_path = processed_output_path(input_path, output_dir, '.jpg')
+
+    # Réduire la résolution si l'image est très grande
+    img.thumbnail((1024, 1024), Image.LANCZOS)
+
+    # Logique pour atteindre la taille cible
+    with _timed(metrics, 'encode'):
+        quality = 90
+        while quality > 10:
+            # Sauvegarder dans un buffer temporaire pour vérifier la taille
+            buffer = io.BytesIO()
+            if output_format == 'JPEG':
+                img.save(buffer, format=output_format, quality=quality, optimize=True)
             else:
-                # Convertir en RGB si nécessaire (pour JPEG)
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                output_format = 'JPEG'
-                output_ext = '.jpg'
-                output_path = os.path.join(output_dir, f"{base_name}_processed.jpg")
-
-            # Réduire la résolution si l'image est très grande
-            img.thumbnail((1024, 1024), Image.LANCZOS)
-
-            # Logique pour atteindre la taille cible
-            quality = 90
-            while quality > 10:
-                # Sauvegarder dans un buffer temporaire pour vérifier la taille
-                import io
-                buffer = io.BytesIO()
-                if output_format == 'JPEG':
-                    img.save(buffer, format=output_format, quality=quality, optimize=True)
-                else:
-                    img.save(buffer, format=output_format, optimize=True) # PNG
-                
-                size_kb = buffer.tell() / 1024
-                
-                if size_kb <= max_size_kb:
-                    # C'est bon, on sauvegarde sur le disque
-                    with open(output_path, 'wb') as f:
-                        f.write(buffer.getvalue())
-                    return output_path
-                
-                # Réduire la qualité pour le prochain essai
-                quality -= 10
+                img.save(buffer, format=output_format, optimize=True) # PNG
+            
+            size_kb = buffer.tell() / 1024
             
-            # Si on n'y arrive pas (très rare), sauvegarder la version la plus basse
-            with open(output_path, 'wb') as f:
-                f.write(buffer.getvalue())
-            return output_path
+            if size_kb <= max_size_kb:
+                break # C'est bon
+            
+            # Réduire la qualité pour le prochain essai
+            quality -= 10
+    
+    # Sauvegarder sur le disque (si on n'a pas atteint la taille cible,
+    # ce qui est très rare, c'est la version la plus basse)
+    with _timed(metrics, 'write'), open(output_path, 'wb') as f:
+        f.write(buffer.getvalue())
+    if metrics is not None:
+        metrics.add_bytes(written=buffer.tell())
+    return output_path, img
+
+def _convert_to_srgb(img):
+    """ Convertit une image munie d'un profil ICC vers sRGB (si ImageCms est disponible). """
+    try:
+        from PIL import ImageCms
+    except ImportError:
+        return img
+    try:
+        has_alpha = img.mode in ('RGBA', 'LA')
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+        source_profile = ImageCms.ImageCmsProfile(io.BytesIO(img.info['icc_profile']))
+        converted = ImageCms.profileToProfile(img, source_profile, ImageCms.createProfile('sRGB'),
+                                              outputMode=img.mode)
+        converted.info.pop('icc_profile', None)
+        return converted
+    except (ImageCms.PyCMSError, OSError) as e:
+        print(f"Profil ICC ignoré: {e}")
+        return img
+
+# --- Harmonisation du lot (NumPy, optionnelle) ---
+
+# Coefficients de luminance (Rec. 601)
+_LUMA = (0.299, 0.587, 0.114)
+# Force de la correction (0 = aucune, 1 = complète) : une correction
+# partielle garde le caractère de chaque photo
+NORMALIZE_STRENGTH = 0.6
+
+def normalization_available():
+    """ L'harmonisation du lot nécessite NumPy (dépendance optionnelle). """
+    return importlib.util.find_spec('numpy') is not None
+
+def normalization_stats(img):
+    """
+    Statistiques d'une image rognée, calculées sur un pixel sur 16 :
+    (moyennes par canal, niveaux 1 % et 99 % de la luminance).
+    process_photos les prend au décodage de chaque photo : le lot n'a
+    jamais besoin d'être en mémoire sous forme de tableaux NumPy.
+    """
+    import numpy as np
+
+    sample = np.asarray(img.convert('RGB'))[::4, ::4].astype(np.float32)
+    luminance = sample @ np.array(_LUMA, dtype=np.float32)
+    low, high = np.percentile(luminance, [1, 99])
+    return sample.mean(axis=(0, 1)), float(low), float(high)
+
+def normalization_corrections(stats, strength=NORMALIZE_STRENGTH):
+    """
+    Corrections de chaque image d'un lot, à partir de leurs statistiques
+    (voir normalization_stats) :
+    - cible commune : médiane des niveaux de tout le lot ;
+    - balance des blancs "monde gris" et étirement des niveaux vers la cible.
+    Retourne une liste de (gains par canal, niveau bas, échelle, décalage).
+    """
+    import numpy as np
+
+    if not stats:
+        return []
+    channel_means = np.array([means for means, _, _ in stats], dtype=np.float32) # (N, 3)
+    low = np.array([low for _, low, _ in stats], dtype=np.float32)
+    high = np.array([high for _, _, high in stats], dtype=np.float32)
+
+    # Cible commune au lot
+    target_low = np.median(low)
+    target_high = np.median(high)
+
+    # Balance des blancs : ramener chaque canal vers la luminance moyenne
+    gray = channel_means @ np.array(_LUMA, dtype=np.float32)
+    gains = np.clip(gray[:, None] / np.maximum(channel_means, 1.0), 0.8, 1.25)
+    gains = 1.0 + strength * (gains - 1.0)
+    # Niveaux : [low, high] de chaque image vers [target_low, target_high]
+    scale = np.clip((target_high - target_low) / np.maximum(high - low, 1.0), 0.6, 1.6)
+    scale = 1.0 + strength * (scale - 1.0)
+    offset = low + strength * (target_low - low)
+    return list(zip(gains, low, scale, offset))
 
+def apply_normalization(img, correction):
+    """
+    Corrige une image (voir normalization_corrections). Retourne une image
+    RGB, ou RGBA si l'image d'origine avait de la transparence.
+    """
+    import numpy as np
+    from PIL import Image
+
+    gains, low, scale, offset = correction
+    alpha = None
+    if img.mode in ('RGBA', 'LA') or 'transparency' in img.info:
+        img = img.convert('RGBA')
+        alpha = img.getchannel('A')
+    pixels = np.asarray(img.convert('RGB')).astype(np.float32) # 1 Mo pour 300x300
+    pixels *= gains
+    pixels -= low
+    pixels *= scale
+    pixels += offset
+    np.clip(pixels, 0, 255, out=pixels)
+    result = Image.fromarray(pixels.astype(np.uint8), 'RGB')
+    if alpha is not None:
+        result.putalpha(alpha)
+    return result
+
+def normalize_batch(images, strength=NORMALIZE_STRENGTH):
+    """
+    Harmonise l'exposition et la balance des blancs d'un lot d'images
+    rognées de même taille (300x300) : statistiques de chaque image, cible
+    commune au lot, puis correction image par image (voir les trois
+    fonctions ci-dessus). La transparence éventuelle est conservée.
+    Retourne la liste des images corrigées.
+    """
+    corrections = normalization_corrections([normalization_stats(img) for img in images], strength)
+    return [apply_normalization(img, correction) for img, correction in zip(images, corrections)]
+
+def process_photos(paths, output_dir, max_size_kb=200, workers=None,
+                   decode_budget_bytes=DECODE_BUDGET_BYTES, thumbnail_size=None,
+                   normalize=False, metrics=None, cancel=None, low_priority=False):
+    """
+    Traite un lot de photos en parallèle : lecture anticipée des fichiers
+    (les archives ZIP sont lues directement, voir expand_photo_sources),
+    puis redimensionnement dans un pool de threads (Pillow libère le GIL
+    pendant le décodage), sous un budget mémoire commun de décodage.
+    Générateur : produit (chemin original, chemin traité ou None, miniature)
+    dans l'ordre d'achèvement. Si thumbnail_size est donné, la miniature est
+    une image PIL (RGB ou RGBA) tirée de l'image encodée, sans relire le
+    fichier traité ; sinon elle vaut None.
+    Si normalize est vrai (et NumPy disponible), toutes les photos sont
+    d'abord décodées et rognées (statistiques prises au passage, voir
+    normalization_stats), puis chacune est corrigée vers la cible commune
+    du lot juste avant d'être encodée : seules les photos rognées du lot
+    restent en mémoire entre-temps (environ 270 Ko par photo).
+    Si 'metrics' (PipelineMetrics) est fourni, chaque étape de chaque photo
+    y est chronométrée (voir PIPELINE_STAGES) avec les octets lus et écrits.
+    Si 'cancel' (threading.Event) est levé, plus aucune photo n'est lue ni
+    commencée : le générateur s'arrête dès que les photos en cours sont
+    terminées, y compris pendant le décodage du lot à harmoniser.
+    Si low_priority est vrai, la lecture anticipée et les threads du pool
+    tournent en priorité basse (voir lower_thread_priority).
+    """
+    paths = expand_photo_sources(paths)
+    workers = workers or os.cpu_count() or 1
+    # Limiter les tâches en attente pour que les tampons lus
+    # ne s'accumulent pas hors du budget de lecture anticipée
+    limit = workers * 2
+    if normalize and not normalization_available():
+        print("NumPy absent : harmonisation des photos désactivée.")
+        normalize = False
+    if metrics is not None:
+        metrics.total = len(paths)
+        metrics.settings.update(workers=workers, normalize=normalize, low_priority=low_priority,
+                                max_size_kb=max_size_kb,
+                                decode_budget_bytes=decode_budget_bytes,
+                                prefetch_budget_bytes=PREFETCH_BUDGET_BYTES)
+    scheduler = DecodeScheduler(decode_budget_bytes)
+    prefetcher = PhotoPrefetcher(paths, metrics=metrics, cancel=cancel, low_priority=low_priority)
+    try:
+        with ThreadPoolExecutor(max_workers=workers,
+                                initializer=lower_thread_priority if low_priority else None) as pool:
+            if not normalize:
+                tasks = ((path, data, output_dir, max_size_kb, scheduler, thumbnail_size, metrics)
+                         for path, data in prefetcher)
+                yield from _counted(metrics, _bounded_map(pool, _process_one, tasks, limit, cancel))
+                return
+
+            # 1. Décoder et rogner tout le lot : seules les images rognées
+            # restent en mémoire, avec les statistiques prises au décodage
+            fitted = deque() # (chemin, image rognée, durée du calcul des statistiques)
+            stats = []
+            tasks = ((path, data, scheduler, metrics) for path, data in prefetcher)
+            for path, img, img_stats, stats_time in _bounded_map(pool, _load_one, tasks, limit, cancel):
+                if img is None:
+                    if metrics is not None:
+                        metrics.image_done(False)
+                    yield path, None, None
+                else:
+                    fitted.append((path, img, stats_time))
+                    stats.append(img_stats)
+            if cancel is not None and cancel.is_set():
+                return
+            # 2. Correction de chaque photo vers la cible commune du lot
+            corrections = deque(normalization_corrections(stats))
+            # 3. Corriger puis encoder chaque photo ; les images rognées
+            # sont libérées au fur et à mesure
+            tasks = ((*fitted.popleft(), corrections.popleft(), output_dir, max_size_kb,
+                      thumbnail_size, metrics) for _ in range(len(fitted)))
+            yield from _counted(metrics, _bounded_map(pool, _encode_one, tasks, limit, cancel))
+    finally:
+        prefetcher.close()
+
+def _counted(metrics, results):
+    """ Compte chaque photo terminée dans les mesures, en la laissant passer. """
+    for result in results:
+        if metrics is not None:
+            metrics.image_done(result[1] is not None)
+        yield result
+
+def _bounded_map(pool, fn, tasks, limit, cancel=None):
+    """
+    Exécute fn(*task) dans le pool pour chaque tâche, avec au plus 'limit'
+    tâches en attente ; produit les résultats dans l'ordre d'achèvement.
+    Si 'cancel' (threading.Event) est levé, les tâches pas encore commencées
+    sont abandonnées et les résultats restants ignorés.
+    """
+    pending = set()
+    for task in tasks:
+        if cancel is not None and cancel.is_set():
+            break
+        while len(pending) >= limit:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        pending.add(pool.submit(fn, *task))
+    while pending:
+        if cancel is not None and cancel.is_set():
+            for future in pending:
+                future.cancel()
+            return
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+def _load_one(path, data, scheduler, metrics):
+    try:
+        img = _load_fitted(path, data, scheduler, to_srgb=True, metrics=metrics)
+        start = time.perf_counter()
+        img_stats = normalization_stats(img)
+        return path, img, img_stats, time.perf_counter() - start
     except Exception as e:
-        print(f"Erreur redimensionnement {input_path}: {e}")
+        print(f"Erreur redimensionnement {path}: {e}")
+        return path, None, None, 0.0
+
+def _encode_one(path, img, stats_time, correction, output_dir, max_size_kb, thumbnail_size, metrics):
+    try:
+        # Étape mesurée : statistiques (au décodage) et correction de la photo
+        start = time.perf_counter()
+        img = apply_normalization(img, correction)
+        if metrics is not None:
+            metrics.record('normalize', stats_time + time.perf_counter() - start)
+        processed_path, img = _encode_fitted(img, path, output_dir, max_size_kb, metrics)
+        with _timed(metrics, 'thumbnail'):
+            return path, processed_path, _make_thumbnail(img, thumbnail_size)
+    except Exception as e:
+        print(f"Erreur redimensionnement {path}: {e}")
+        return path, None, None
+
+def _process_one(path, data, output_dir, max_size_kb, scheduler, thumbnail_size, metrics):
+    try:
+        processed_path, img = _resize_image(path, output_dir, max_size_kb, data, scheduler, metrics)
+        with _timed(metrics, 'thumbnail'):
+            return path, processed_path, _make_thumbnail(img, thumbnail_size)
+    except Exception as e:
+        print(f"Erreur redimensionnement {path}: {e}")
+        return path, None, None
+
+def _make_thumbnail(img, thumbnail_size):
+    if not thumbnail_size:
         return None
+    thumbnail = img.copy()
+    thumbnail.thumbnail((thumbnail_size, thumbnail_size))
+    if thumbnail.mode not in ('RGB', 'RGBA'):
+        thumbnail = thumbnail.convert('RGBA')
+    return thumbnail
 
 # --- 2. Lecteur Excel (openpyxl) ---
 
@@ -95,6 +890,8 @@ def read_excel(filepath):
     """
     Ouvre un fichier Excel et lit la première colonne (A) comme liste de noms.
     """
+    from openpyxl import load_workbook
+
     try:
         workbook = load_workbook(filename=filepath, read_only=True)
         sheet = workbook.active
@@ -109,68 +906,588 @@ def read_excel(filepath):
         print(f"Erreur lecture Excel {filepath}: {e}")
         return None
 
+_XLSX_NS = {
+    'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+    'xdr': 'http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing',
+    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+}
+
+def _xlsx_rels(archive, part):
+    """ Relations d'une partie du classeur : dict {id: chemin de la cible}. """
+    rels_part = posixpath.join(posixpath.dirname(part), '_rels', posixpath.basename(part) + '.rels')
+    if rels_part not in archive.namelist():
+        return {}
+    rels = {}
+    for rel in ElementTree.fromstring(archive.read(rels_part)).findall('rel:Relationship', _XLSX_NS):
+        target = rel.get('Target')
+        if rel.get('TargetMode') == 'External':
+            continue
+        if target.startswith('/'):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+        rels[rel.get('Id')] = (target, rel.get('Type', ''))
+    return rels
+
+def _xlsx_text(element):
+    """ Texte d'une chaîne partagée ou en ligne (y compris texte enrichi). """
+    return ''.join(t.text or '' for t in element.iter(f"{{{_XLSX_NS['main']}}}t"))
+
+def _xlsx_column_a(archive, sheet_part):
+    """
+    Lit les noms de la colonne A d'une feuille en flux (iterparse) :
+    dict {numéro de ligne (0 = première ligne): nom}.
+    """
+    shared_strings = []
+    if 'xl/sharedStrings.xml' in archive.namelist():
+        root = ElementTree.fromstring(archive.read('xl/sharedStrings.xml'))
+        shared_strings = [_xlsx_text(si) for si in root.findall('main:si', _XLSX_NS)]
+
+    names = {}
+    row_tag = f"{{{_XLSX_NS['main']}}}row"
+    cell_tag = f"{{{_XLSX_NS['main']}}}c"
+    with archive.open(sheet_part) as sheet:
+        for _, element in ElementTree.iterparse(sheet):
+            if element.tag == cell_tag:
+                ref = element.get('r', '')
+                if ref.rstrip('0123456789') != 'A':
+                    continue
+                row = int(ref[1:]) - 1 # "A12" -> ligne 11
+                cell_type = element.get('t')
+                value = element.find('main:v', _XLSX_NS)
+                if cell_type == 'inlineStr':
+                    text = _xlsx_text(element)
+                elif value is None or value.text is None:
+                    continue
+                elif cell_type == 's':
+                    text = shared_strings[int(value.text)]
+                else:
+                    text = value.text
+                if text.strip():
+                    names[row] = text.strip()
+            elif element.tag == row_tag:
+                element.clear() # Libérer la mémoire au fil de la lecture
+    return names
+
+def read_excel_photos(filepath):
+    """
+    Lit les photos insérées dans la feuille active du classeur, à côté des
+    noms de la colonne A. Le classeur est lu directement comme une archive
+    ZIP (feuille, dessins et médias) sans charger le modèle openpyxl, et
+    les images ne sont pas décompressées ici : elles sont désignées par un
+    chemin d'archive (voir archive_member_path) et lues au traitement.
+    Retourne un dict {chemin de la photo: nom de la ligne}.
+    """
+    try:
+        with zipfile.ZipFile(filepath) as archive:
+            # Feuille active (comme workbook.active dans openpyxl)
+            workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+            view = workbook.find('main:bookViews/main:workbookView', _XLSX_NS)
+            active_tab = int(view.get('activeTab', 0)) if view is not None else 0
+            sheets = workbook.findall('main:sheets/main:sheet', _XLSX_NS)
+            sheet_rel = sheets[active_tab].get(f"{{{_XLSX_NS['r']}}}id")
+            sheet_part = _xlsx_rels(archive, 'xl/workbook.xml')[sheet_rel][0]
+
+            drawing_parts = [target for target, rel_type in _xlsx_rels(archive, sheet_part).values()
+                             if rel_type.endswith('/drawing')]
+            if not drawing_parts:
+                return {}
+            names = _xlsx_column_a(archive, sheet_part)
+
+            photos = {}
+            named = set() # Une seule photo par nom
+            for drawing_part in drawing_parts:
+                media = _xlsx_rels(archive, drawing_part)
+                drawing = ElementTree.fromstring(archive.read(drawing_part))
+                for anchor_tag in ('xdr:twoCellAnchor', 'xdr:oneCellAnchor'):
+                    for anchor in drawing.findall(anchor_tag, _XLSX_NS):
+                        row = anchor.find('xdr:from/xdr:row', _XLSX_NS)
+                        blip = anchor.find('xdr:pic/xdr:blipFill/a:blip', _XLSX_NS)
+                        if row is None or blip is None:
+                            continue
+                        name = names.get(int(row.text))
+                        media_part = media.get(blip.get(f"{{{_XLSX_NS['r']}}}embed"), (None,))[0]
+                        if (name and media_part
+                                and os.path.splitext(media_part)[1].lower() in SUPPORTED_FORMATS
+                                and name not in named):
+                            photos[archive_member_path(filepath, media_part)] = name
+                            named.add(name)
+            return photos
+    except Exception as e:
+        print(f"Erreur lecture photos Excel {filepath}: {e}")
+        return {}
+
+def normalize_name(name):
+    """
+    Forme de recherche d'un nom : sans accents, en minuscules, espaces
+    simplifiés ("  Élodie  DURAND" -> "elodie durand").
+    """
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().replace('-', ' ').split())
+
+class NameIndex:
+    """
+    Index de recherche incrémentale des noms, insensible aux accents et à
+    la casse. Chaque mot de chaque nom est une clé d'une liste triée : une
+    recherche par préfixe est une simple dichotomie (bisect), ce qui reste
+    bien en dessous de la milliseconde pour quelques milliers de noms.
+    Les noms sont identifiés par leur position dans 'names' (les doublons
+    sont donc possibles) et peuvent être retirés / remis dans les résultats.
+    """
+    def __init__(self, names):
+        self.names = list(names)
+        self._active = [True] * len(self.names)
+        entries = []
+        for name_id, name in enumerate(self.names):
+            for word in set(normalize_name(name).split()):
+                entries.append((word, name_id))
+        entries.sort()
+        self._words = [word for word, _ in entries]
+        self._ids = [name_id for _, name_id in entries]
+
+    def _prefix_ids(self, prefix):
+        start = bisect_left(self._words, prefix)
+        end = bisect_left(self._words, prefix + '\uffff', start)
+        return set(self._ids[start:end])
+
+    def search(self, query, limit=30):
+        """
+        Retourne les identifiants des noms actifs dont chaque mot de la
+        requête préfixe un mot du nom ("dur el" trouve "Élodie Durand"),
+        dans l'ordre de la liste d'origine.
+        """
+        words = normalize_name(query).split()
+        if not words:
+            matches = range(len(self.names))
+        else:
+            # Commencer par le mot le plus long : le plus sélectif
+            words.sort(key=len, reverse=True)
+            candidates = self._prefix_ids(words[0])
+            for word in words[1:]:
+                if not candidates:
+                    break
+                candidates &= self._prefix_ids(word)
+            matches = sorted(candidates)
+        results = []
+        for name_id in matches:
+            if self._active[name_id]:
+                results.append(name_id)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def deactivate(self, name_id):
+        self._active[name_id] = False
+
+    def activate(self, name_id):
+        self._active[name_id] = True
+
+    def find(self, name, active=True):
+        """ Identifiant d'un nom actif (ou inactif) égal à 'name', ou None. """
+        return next((name_id for name_id, candidate in enumerate(self.names)
+                     if candidate == name and self._active[name_id] == active), None)
+
+    def add(self, name):
+        """ Ajoute un nom (actif) à l'index et retourne son identifiant. """
+        name_id = len(self.names)
+        self.names.append(name)
+        self._active.append(True)
+        for word in set(normalize_name(name).split()):
+            # Le nouvel identifiant est le plus grand : il va après les mots égaux
+            position = bisect_right(self._words, word)
+            self._words.insert(position, word)
+            self._ids.insert(position, name_id)
+        return name_id
+
 # --- 3. Exportateur Word (python-docx) ---
 
+# Hauteurs réservées (en points) : sous chaque photo pour le nom (10 pt en
+# interligne simple, plus la descente de la ligne de l'image), et en haut de
+# chaque page pour le paragraphe qui porte le saut de page
+GRID_NAME_LINE_PT = 18
+GRID_PAGE_RESERVE_PT = 14
+
+def grid_photo_box(cols, rows, usable_width, usable_height, point=1):
+    """
+    Place maximale (largeur, hauteur) d'une photo dans une grille cols x rows
+    qui doit tenir sur une page de taille utile usable_width x usable_height :
+    90 % de la largeur de cellule, et une hauteur qui laisse la ligne du nom.
+    'point' vaut un point typographique dans l'unité des tailles (12700 en
+    EMU pour le document Word, PREVIEW_DPI / 72 en pixels pour l'aperçu).
+    """
+    row_height = (usable_height - GRID_PAGE_RESERVE_PT * point) / rows
+    return usable_width / cols * 0.9, row_height - GRID_NAME_LINE_PT * point
+
+def fit_box(width, height, box_width, box_height):
+    """ Dimensions (width, height) réduites pour tenir dans la boîte, proportions gardées. """
+    scale = min(box_width / width, box_height / height)
+    return int(width * scale), int(height * scale)
+
+def paginate_associations(associations, layout_str):
+    """
+    Découpe les associations en pages, dans l'ordre de l'export (par nom
+    d'étudiant). 'layout_str' est "colonnes x lignes par page" ("3x4", ...).
+    Retourne (colonnes, lignes, [[(photo_path, student_name), ...], ...]).
+    """
+    cols, rows_per_page = map(int, layout_str.split('x'))
+    sorted_items = sorted(associations.items(), key=lambda item: item[1])
+    per_page = cols * rows_per_page
+    pages = [sorted_items[i:i + per_page] for i in range(0, len(sorted_items), per_page)]
+    return cols, rows_per_page, pages
+
 def create_word_doc(associations, layout_str, save_path):
     """
     Crée un document Word .docx avec les photos et les noms.
     'associations' est un dict: {photo_path: student_name}
-    'layout_str' est "3x4", "4x5", etc.
+    'layout_str' est "3x4", "4x5", etc. : un tableau par page, séparés
+    par des sauts de page (voir paginate_associations).
+    Pour des exports successifs du même trombinoscope, garder un
+    WordExporter : il ne reconstruit que les pages modifiées.
     """
-    try:
-        cols, rows_per_page = map(int, layout_str.split('x'))
-        
-        doc = Document()
+    return WordExporter().export(associations, layout_str, save_path)
+
+class WordExporter:
+    """
+    Export Word incrémental. Le document du dernier export reste en mémoire,
+    avec l'empreinte de chaque page (mise en page, empreintes des photos et
+    noms, dans l'ordre) : au nouvel export, les pages dont l'empreinte n'a
+    pas changé reprennent leur tableau tel quel, et une photo déjà présente
+    dans le document réutilise son image (une seule copie par contenu).
+
+    Les images sont ajoutées sans passer par run.add_picture : python-docx
+    y recalcule l'empreinte de toutes les images déjà ajoutées et parcourt
+    tout le document à chaque photo (coût quadratique sur les gros lots).
+    """
+    def __init__(self):
+        self.doc = None
+        self.col_width = None
+        self.page_height = None # Hauteur utile de la page
+        self.pages = {} # {empreinte de page: élément w:tbl}
+        self.media = {} # {empreinte de photo: rId de l'image dans le document}
+        self._hashes = {} # {photo_path: ((taille, date de modification), empreinte)}
+        self._next_image = 1
+        self._next_shape_id = 1
+
+    def export(self, associations, layout_str, save_path):
+        """ Écrit le document ; retourne True si l'export a réussi. """
+        try:
+            cols, rows_per_page, pages = paginate_associations(associations, layout_str)
+            if self.doc is None:
+                self._new_document()
+            col_width = int(self.col_width / cols)
+            photo_box = grid_photo_box(cols, rows_per_page, self.col_width, self.page_height, point=12700)
+            body = self.doc.element.body
+
+            # Retirer le contenu de l'export précédent (sauf les propriétés de section)
+            for child in list(body):
+                if child is not body.sectPr:
+                    body.remove(child)
+
+            previous_pages, self.pages = self.pages, {}
+            for page_index, page in enumerate(pages):
+                if page_index:
+                    _compact(self.doc.add_page_break())
+                key = self._page_key(layout_str, page)
+                table = previous_pages.pop(key, None)
+                if table is None:
+                    table = self._build_page(page, cols, col_width, photo_box)
+                else:
+                    body.sectPr.addprevious(table) # Page inchangée : tableau repris tel quel
+                self.pages[key] = table
+
+            self._drop_unused_media()
+            self.doc.save(save_path)
+            return True
+        except Exception as e:
+            print(f"Erreur création DOCX: {e}")
+            self.doc = None # Repartir d'un document neuf au prochain export
+            self.pages = {}
+            self.media = {}
+            return False
+
+    def _new_document(self):
+        from docx import Document
+        from docx.shared import Inches
+
+        self.doc = Document()
         # Mettre des marges plus petites
-        sections = doc.sections
+        sections = self.doc.sections
         for section in sections:
             section.left_margin = Inches(0.5)
             section.right_margin = Inches(0.5)
             section.top_margin = Inches(0.5)
             section.bottom_margin = Inches(0.5)
+        # Taille utile de la page (la largeur est divisée par le nombre de colonnes)
+        section = self.doc.sections[0]
+        self.col_width = section.page_width - section.left_margin - section.right_margin
+        self.page_height = section.page_height - section.top_margin - section.bottom_margin
+        self.pages = {}
+        self.media = {}
+        self._next_image = 1
+        self._next_shape_id = 1
 
-        table = doc.add_table(rows=1, cols=cols)
-        table.autofit = False
-        
-        # Calcul de la largeur de colonne
-        col_width = int((doc.sections[0].page_width - doc.sections[0].left_margin - doc.sections[0].right_margin) / cols)
-        for col in table.columns:
-            col.width = col_width
+    def _photo_hash(self, photo_path):
+        """ Empreinte du contenu de la photo, recalculée seulement si le fichier a changé. """
+        stat = os.stat(photo_path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        cached = self._hashes.get(photo_path)
+        if cached and cached[0] == signature:
+            return cached[1]
+        digest = file_hash(photo_path)
+        self._hashes[photo_path] = (signature, digest)
+        return digest
 
-        row_cells = table.rows[0].cells
-        item_index = 0
-        
-        # Trier les associations par nom d'étudiant pour l'export
-        sorted_items = sorted(associations.items(), key=lambda item: item[1])
-        total_items = len(sorted_items)
+    def _page_key(self, layout_str, page):
+        digest = hashlib.sha1(layout_str.encode('utf-8'))
+        for photo_path, student_name in page:
+            try:
+                photo = self._photo_hash(photo_path)
+            except OSError:
+                photo = photo_path # Photo illisible : la page l'indiquera
+            digest.update(f"\0{photo}\0{student_name}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _build_page(self, page, cols, col_width, photo_box):
+        from docx.shared import Pt
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+        table = self.doc.add_table(rows=0, cols=cols)
+        table.autofit = False
 
-        for photo_path, student_name in sorted_items:
+        for item_index, (photo_path, student_name) in enumerate(page):
+            # Nouvelle ligne toutes les 'cols' photos
+            if item_index % cols == 0:
+                row_cells = table.add_row().cells
+                for col in table.columns:
+                    col.width = col_width # Réappliquer la largeur
             cell = row_cells[item_index % cols]
             
             # Ajouter l'image
             try:
+                _compact(cell.paragraphs[0])
                 run = cell.paragraphs[0].add_run()
-                run.add_picture(photo_path, width=col_width * 0.9) # 90% de la largeur de cellule
+                self._add_picture(run, photo_path, photo_box) # Voir grid_photo_box
                 cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
             except Exception as img_e:
                 cell.paragraphs[0].add_run(f"[Image {photo_path} illisible]")
                 print(f"Erreur ajout image {photo_path} au DOCX: {img_e}")
             
             # Ajouter le nom
-            p = cell.add_paragraph(student_name)
+            p = _compact(cell.add_paragraph(student_name))
             p.alignment = WD_ALIGN_PARAGRAPH.CENTER
             p.runs[0].font.size = Pt(10)
-            
-            item_index += 1
-            
-            # Ajouter une nouvelle ligne si nécessaire
-            if item_index % cols == 0 and item_index < total_items:
-                row_cells = table.add_row().cells
-                for col in table.columns:
-                    col.width = col_width # Réappliquer la largeur
+        return table._tbl
+
+    def _add_picture(self, run, photo_path, box):
+        """ Équivalent de run.add_picture, avec une seule image par contenu. """
+        from docx.image.image import Image as DocxImage
+        from docx.opc.constants import RELATIONSHIP_TYPE as RT
+        from docx.opc.packuri import PackURI
+        from docx.oxml.shape import CT_Inline
+        from docx.parts.image import ImagePart
+
+        photo = self._photo_hash(photo_path)
+        rId = self.media.get(photo)
+        if rId is None:
+            image = DocxImage.from_file(photo_path)
+            partname = PackURI(f"/word/media/image{self._next_image}.{image.ext}")
+            self._next_image += 1
+            rId = self.doc.part.relate_to(ImagePart.from_image(image, partname), RT.IMAGE)
+            self.media[photo] = rId
+        image = self.doc.part.related_parts[rId].image
+        cx, cy = fit_box(image.width, image.height, *box)
+        inline = CT_Inline.new_pic_inline(self._next_shape_id, rId, os.path.basename(photo_path), cx, cy)
+        self._next_shape_id += 1
+        run._r.add_drawing(inline)
+
+    def _drop_unused_media(self):
+        """ Retire les images qui ne sont plus utilisées par aucune page. """
+        used = set(self.doc.element.body.xpath('.//a:blip/@r:embed'))
+        for photo, rId in list(self.media.items()):
+            if rId not in used:
+                self.doc.part.drop_rel(rId)
+                del self.media[photo]
+
+def _compact(paragraph):
+    """
+    Retire l'espacement du modèle par défaut (10 pt après chaque paragraphe,
+    interligne 1,15) : sinon les lignes de la grille dépassent la page.
+    """
+    paragraph.paragraph_format.space_after = 0
+    paragraph.paragraph_format.line_spacing = 1
+    return paragraph
+
+# --- 4. Export HTML (site statique) ---
+
+# Côté d'une miniature dans les planches (sprites), en pixels
+GALLERY_THUMB_SIZE = 100
+# Nombre de miniatures par planche et par ligne de planche
+GALLERY_ATLAS_COUNT = 100
+GALLERY_ATLAS_COLUMNS = 10
+# Nom des photos copiées par l'export : 16 caractères hexadécimaux + extension
+_GALLERY_PHOTO_NAME = re.compile(r'[0-9a-f]{16}(\.[a-z0-9]+)?')
+
+def file_hash(path):
+    """ Empreinte SHA-1 du contenu d'un fichier. """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _build_atlas(photo_paths, atlas_path):
+    """ Assemble les miniatures d'un groupe de photos en une seule image JPEG. """
+    from PIL import Image, ImageOps
+
+    rows = (len(photo_paths) + GALLERY_ATLAS_COLUMNS - 1) // GALLERY_ATLAS_COLUMNS
+    columns = min(len(photo_paths), GALLERY_ATLAS_COLUMNS)
+    atlas = Image.new('RGB', (columns * GALLERY_THUMB_SIZE, rows * GALLERY_THUMB_SIZE), 'white')
+    for i, photo_path in enumerate(photo_paths):
+        with Image.open(photo_path) as img:
+            img.draft('RGB', (GALLERY_THUMB_SIZE, GALLERY_THUMB_SIZE))
+            thumb = ImageOps.fit(img.convert('RGB'), (GALLERY_THUMB_SIZE, GALLERY_THUMB_SIZE), Image.LANCZOS)
+        x = (i % GALLERY_ATLAS_COLUMNS) * GALLERY_THUMB_SIZE
+        y = (i // GALLERY_ATLAS_COLUMNS) * GALLERY_THUMB_SIZE
+        atlas.paste(thumb, (x, y))
+    # Écrire puis renommer : une planche interrompue n'est jamais réutilisée
+    atlas.save(atlas_path + '.tmp', format='JPEG', quality=85, optimize=True)
+    os.replace(atlas_path + '.tmp', atlas_path)
+
+_GALLERY_TEMPLATE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 20px; }}
+#search {{ font-size: 18px; padding: 6px; width: 300px; margin-bottom: 20px; }}
+#grid {{ display: flex; flex-wrap: wrap; gap: 16px; }}
+figure {{ margin: 0; width: {size}px; text-align: center; cursor: pointer; }}
+figure a {{ display: block; width: {size}px; height: {size}px; }}
+figcaption {{ font-size: 13px; margin-top: 4px; }}
+#viewer {{ display: none; position: fixed; inset: 0; background: rgba(0,0,0,.8);
+          align-items: center; justify-content: center; flex-direction: column; color: white; }}
+#viewer img {{ max-width: 90vw; max-height: 80vh; }}
+{atlas_css}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<input id="search" type="search" placeholder="Rechercher un nom..." autofocus>
+<div id="grid">
+{figures}
+</div>
+<div id="viewer"><img alt=""><p></p></div>
+<script>
+// Index de recherche : [noms normalisés (sans accents, minuscules)] dans l'ordre des vignettes
+const INDEX = {index};
+const figures = document.querySelectorAll('#grid figure');
+function normalize(text) {{
+  return text.normalize('NFKD').replace(/[\\u0300-\\u036f]/g, '').toLowerCase()
+             .replace(/-/g, ' ').split(/\\s+/).filter(Boolean);
+}}
+document.getElementById('search').addEventListener('input', function () {{
+  const query = normalize(this.value);
+  INDEX.forEach(function (words, i) {{
+    const match = query.every(q => words.some(w => w.startsWith(q)));
+    figures[i].style.display = match ? '' : 'none';
+  }});
+}});
+// Les photos pleine taille ne sont chargées qu'à l'ouverture
+const viewer = document.getElementById('viewer');
+document.getElementById('grid').addEventListener('click', function (event) {{
+  const link = event.target.closest('a');
+  if (!link) return;
+  event.preventDefault();
+  viewer.querySelector('img').src = link.href;
+  viewer.querySelector('p').textContent = link.dataset.name;
+  viewer.style.display = 'flex';
+}});
+viewer.addEventListener('click', function () {{ viewer.style.display = 'none'; }});
+</script>
+</body>
+</html>
+"""
+
+def create_html_gallery(associations, output_dir, title="Trombinoscope"):
+    """
+    Crée un site statique (index.html) avec les photos et les noms.
+    Les miniatures sont regroupées en planches (une image pour 100 photos,
+    affichées par décalage CSS) au lieu d'une requête par photo ; les photos
+    pleine taille ne sont chargées qu'au clic ; la recherche se fait dans le
+    navigateur sur un index des noms.
+    Les planches sont générées en parallèle et nommées d'après une empreinte
+    de leurs photos : une planche dont les photos n'ont pas changé n'est pas
+    régénérée lors d'un nouvel export dans le même dossier.
+    'associations' est un dict: {photo_path: student_name}
+    """
+    try:
+        photos_dir = os.path.join(output_dir, 'photos')
+        atlas_dir = os.path.join(output_dir, 'atlases')
+        os.makedirs(photos_dir, exist_ok=True)
+        os.makedirs(atlas_dir, exist_ok=True)
+
+        # Trier les associations par nom d'étudiant pour l'export
+        sorted_items = sorted(associations.items(), key=lambda item: item[1])
+
+        # Photos pleine taille, nommées par leur contenu
+        photo_names = []
+        for photo_path, _ in sorted_items:
+            name = file_hash(photo_path)[:16] + os.path.splitext(photo_path)[1].lower()
+            target = os.path.join(photos_dir, name)
+            if not os.path.exists(target):
+                shutil.copyfile(photo_path, target)
+            photo_names.append(name)
+
+        # Planches : seules celles dont l'empreinte est nouvelle sont créées
+        atlases = []
+        to_build = []
+        for start in range(0, len(sorted_items), GALLERY_ATLAS_COUNT):
+            chunk = photo_names[start:start + GALLERY_ATLAS_COUNT]
+            fingerprint = hashlib.sha1(
+                f"{GALLERY_THUMB_SIZE}:{GALLERY_ATLAS_COLUMNS}:{','.join(chunk)}".encode()).hexdigest()[:16]
+            atlas_name = f"atlas-{fingerprint}.jpg"
+            atlases.append(atlas_name)
+            atlas_path = os.path.join(atlas_dir, atlas_name)
+            if not os.path.exists(atlas_path):
+                to_build.append(([os.path.join(photos_dir, n) for n in chunk], atlas_path))
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+            for future in [pool.submit(_build_atlas, *job) for job in to_build]:
+                future.result()
+        # Supprimer les planches et photos qui ne servent plus
+        for old_path in glob.glob(os.path.join(atlas_dir, 'atlas-*.jpg')):
+            old_name = os.path.basename(old_path)
+            if old_name not in atlases and re.fullmatch(r'atlas-[0-9a-f]{16}\.jpg', old_name):
+                os.remove(old_path)
+        # (seulement les fichiers écrits par l'export, reconnus à leur nom)
+        used_photos = set(photo_names)
+        for old_name in os.listdir(photos_dir):
+            if old_name not in used_photos and _GALLERY_PHOTO_NAME.fullmatch(old_name):
+                os.remove(os.path.join(photos_dir, old_name))
+
+        atlas_css = "\n".join(f".a{i} {{ background-image: url(atlases/{name}); }}"
+                               for i, name in enumerate(atlases))
+        figures = []
+        for i, (_, student_name) in enumerate(sorted_items):
+            position = i % GALLERY_ATLAS_COUNT
+            x = (position % GALLERY_ATLAS_COLUMNS) * GALLERY_THUMB_SIZE
+            y = (position // GALLERY_ATLAS_COLUMNS) * GALLERY_THUMB_SIZE
+            name = html.escape(student_name)
+            figures.append(
+                f'<figure><a class="a{i // GALLERY_ATLAS_COUNT}" href="photos/{photo_names[i]}" '
+                f'data-name="{name}" style="background-position: -{x}px -{y}px"></a>'
+                f'<figcaption>{name}</figcaption></figure>')
+        index = json.dumps([normalize_name(name).split() for _, name in sorted_items])
 
-        doc.save(save_path)
+        page = _GALLERY_TEMPLATE.format(
+            title=html.escape(title), size=GALLERY_THUMB_SIZE, atlas_css=atlas_css,
+            figures="\n".join(figures), index=index.replace('</', '<\\/'))
+        with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as f:
+            f.write(page)
         return True
     except Exception as e:
-        print(f"Erreur création DOCX: {e}")
-        return False
\ No newline at end of file
+        print(f"Erreur création HTML: {e}")
+        return False
@@ -1,6 +1,9 @@
-from PySide6.QtWidgets import QListWidget, QAbstractItemView, QWidget, QVBoxLayout, QLabel, QProgressBar, QListWidgetItem
+from PySide6.QtWidgets import (QListWidget, QAbstractItemView, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                               QProgressBar, QListWidgetItem, QLineEdit, QPushButton)
 from PySide6.QtCore import Qt, Signal, QSize, QUrl, QMimeData
-from PySide6.QtGui import QIcon, QDropEvent, QDragEnterEvent, QDragMoveEvent, QDrag
+from PySide6.QtGui import QIcon, QDropEvent, QDragEnterEvent, QDragMoveEvent, QDrag, QKeySequence, QShortcut
+
+from utils import NameIndex
 
 # --- Widget pour la liste des noms (Source du Drag) ---
 
@@ -111,21 +114,228 @@ class PhotoDropWidget(QListWidget):
             student_name = event.mimeData().text()
             photo_path = item.data(Qt.UserRole) 
             
-            item.setText(student_name)
+            # Le texte de la photo et la liste des noms sont mis à jour par
+            # la page, à partir du catalogue (voir AssociationPage.onCatalogChanged)
             self.itemAssociated.emit(photo_path, student_name)
             
-            source_widget = event.source()
-            if isinstance(source_widget, QListWidget):
-                items_to_remove = source_widget.findItems(student_name, Qt.MatchExactly)
-                if items_to_remove:
-                    source_widget.takeItem(source_widget.row(items_to_remove[0]))
-            
             event.acceptProposedAction()
             print(f"... Association RÉUSSIE : {student_name} -> {photo_path}")
         else:
             print("... Drop dans le vide (pas sur un item). Action ignorée.")
             event.ignore()
 
+# --- Widget d'association rapide au clavier (alternative au Drag & Drop) ---
+
+class RapidAssociationWidget(QWidget):
+    """
+    Affiche une photo non associée en grand et un champ de recherche sur
+    les noms restants. La liste des candidats se met à jour à chaque
+    frappe ; Entrée associe le nom sélectionné et passe à la photo suivante.
+    Raccourcis : Haut/Bas (choisir un nom), Entrée (associer),
+    Ctrl+Z (annuler), Ctrl+Droite / Ctrl+Gauche (photo suivante / précédente).
+    """
+    itemAssociated = Signal(str, str) # Chemin de la photo, nom
+    itemUnassociated = Signal(str, str) # Chemin de la photo, nom (annulation)
+
+    PHOTO_SIZE = 260
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.photos = [] # liste de (chemin, QIcon)
+        self.photoIndex = {} # dict {chemin: position dans self.photos}
+        self.assigned = [] # nom associé à chaque photo (None sinon)
+        self.current = 0
+        self.index = NameIndex([])
+        self.undoStack = [] # liste de (index photo, id du nom)
+
+        layout = QHBoxLayout(self)
+
+        # Panneau de gauche : la photo courante
+        photo_panel = QVBoxLayout()
+        self.photoLabel = QLabel()
+        self.photoLabel.setFixedSize(self.PHOTO_SIZE, self.PHOTO_SIZE)
+        self.photoLabel.setAlignment(Qt.AlignCenter)
+        photo_panel.addWidget(self.photoLabel, 0, Qt.AlignCenter)
+        self.counterLabel = QLabel()
+        self.counterLabel.setAlignment(Qt.AlignCenter)
+        photo_panel.addWidget(self.counterLabel)
+        navigation = QHBoxLayout()
+        self.previousButton = QPushButton("◀ Précédente")
+        self.previousButton.clicked.connect(lambda: self.moveTo(self.current - 1, -1))
+        self.undoButton = QPushButton("Annuler")
+        self.undoButton.clicked.connect(self.undo)
+        self.nextButton = QPushButton("Suivante ▶")
+        self.nextButton.clicked.connect(lambda: self.moveTo(self.current + 1, 1))
+        navigation.addWidget(self.previousButton)
+        navigation.addWidget(self.undoButton)
+        navigation.addWidget(self.nextButton)
+        photo_panel.addLayout(navigation)
+        layout.addLayout(photo_panel)
+
+        # Panneau de droite : recherche et candidats
+        search_panel = QVBoxLayout()
+        search_panel.addWidget(QLabel("Tapez le nom puis Entrée :"))
+        self.searchEdit = QLineEdit()
+        self.searchEdit.setPlaceholderText("ex: dur elo")
+        self.searchEdit.textChanged.connect(self.updateCandidates)
+        self.searchEdit.returnPressed.connect(self.assignCurrent)
+        self.searchEdit.installEventFilter(self)
+        search_panel.addWidget(self.searchEdit)
+        self.candidateList = QListWidget()
+        self.candidateList.itemActivated.connect(lambda item: self.assignCurrent())
+        search_panel.addWidget(self.candidateList)
+        layout.addLayout(search_panel, 1)
+
+        QShortcut(QKeySequence.Undo, self, self.undo)
+        QShortcut(QKeySequence("Ctrl+Right"), self, lambda: self.moveTo(self.current + 1, 1))
+        QShortcut(QKeySequence("Ctrl+Left"), self, lambda: self.moveTo(self.current - 1, -1))
+
+    def load(self, photos, names):
+        """
+        photos : liste de (chemin, QIcon) des photos non associées.
+        names : noms restant à associer.
+        """
+        self.photos = list(photos)
+        self.photoIndex = {path: i for i, (path, _) in enumerate(self.photos)}
+        self.assigned = [None] * len(self.photos)
+        self.index = NameIndex(names)
+        self.undoStack = []
+        self.current = 0
+        self.searchEdit.clear()
+        self.showCurrent()
+        self.updateCandidates()
+        self.searchEdit.setFocus()
+
+    def addPhoto(self, path, icon):
+        """ Ajoute une photo arrivée après load() (traitement encore en cours). """
+        if path in self.photoIndex:
+            return
+        waiting = self.assigned.count(None) == 0 # Plus rien n'était affiché
+        self.photoIndex[path] = len(self.photos)
+        self.photos.append((path, icon))
+        self.assigned.append(None)
+        if waiting:
+            self.current = len(self.photos) - 1
+        self.showCurrent()
+
+    def nameTaken(self, path, name):
+        """
+        Un nom a été associé hors du mode clavier (photos de l'Excel, autre
+        vue) : il sort des candidats, et la photo est passée si elle est ici.
+        """
+        photo_index = self.photoIndex.get(path)
+        if photo_index is not None and self.assigned[photo_index] == name:
+            return # Association faite dans ce widget
+        name_id = self.index.find(name)
+        if name_id is not None:
+            self.index.deactivate(name_id)
+        if photo_index is not None:
+            self.assigned[photo_index] = name
+        self.moveTo(self.current, 1)
+        self.updateCandidates()
+
+    def nameReleased(self, path, name):
+        """ Un nom a été libéré hors du mode clavier : il redevient candidat. """
+        photo_index = self.photoIndex.get(path)
+        if photo_index is not None:
+            if self.assigned[photo_index] != name:
+                return # Annulation faite dans ce widget
+            self.assigned[photo_index] = None
+        name_id = self.index.find(name, active=False)
+        if name_id is None:
+            self.index.add(name) # Nom déjà pris au chargement
+        else:
+            self.index.activate(name_id)
+        self.moveTo(self.current, 1)
+        self.updateCandidates()
+
+    def updatePhoto(self, old_path, path, icon):
+        """ Remplace une photo retraitée (nouveau chemin et nouvelle icône). """
+        photo_index = self.photoIndex.pop(old_path, None)
+        if photo_index is None:
+            return
+        self.photoIndex[path] = photo_index
+        self.photos[photo_index] = (path, icon)
+        if photo_index == self.current:
+            self.showCurrent()
+
+    def eventFilter(self, obj, event):
+        # Les flèches du champ de recherche déplacent la sélection des candidats
+        if obj is self.searchEdit and event.type() == event.Type.KeyPress:
+            if event.key() in (Qt.Key_Down, Qt.Key_Up):
+                step = 1 if event.key() == Qt.Key_Down else -1
+                row = self.candidateList.currentRow() + step
+                if 0 <= row < self.candidateList.count():
+                    self.candidateList.setCurrentRow(row)
+                return True
+        return super().eventFilter(obj, event)
+
+    def updateCandidates(self):
+        self.candidateList.setUpdatesEnabled(False)
+        self.candidateList.clear()
+        for name_id in self.index.search(self.searchEdit.text()):
+            item = QListWidgetItem(self.index.names[name_id])
+            item.setData(Qt.UserRole, name_id)
+            self.candidateList.addItem(item)
+        if self.candidateList.count():
+            self.candidateList.setCurrentRow(0)
+        self.candidateList.setUpdatesEnabled(True)
+
+    def showCurrent(self):
+        remaining = self.assigned.count(None)
+        if not self.photos or remaining == 0:
+            self.photoLabel.setText("Aucune photo à associer.")
+            self.counterLabel.setText("")
+            return
+        path, icon = self.photos[self.current]
+        self.photoLabel.setPixmap(icon.pixmap(self.PHOTO_SIZE, self.PHOTO_SIZE))
+        self.counterLabel.setText(f"Photo {self.current + 1} / {len(self.photos)} "
+                                  f"({remaining} restantes)")
+
+    def moveTo(self, index, step):
+        """ Va à la prochaine photo non associée à partir de index, dans le sens step. """
+        if not self.photos:
+            return
+        for offset in range(len(self.photos)):
+            candidate = (index + offset * step) % len(self.photos)
+            if self.assigned[candidate] is None:
+                self.current = candidate
+                break
+        self.showCurrent()
+
+    def assignCurrent(self):
+        item = self.candidateList.currentItem()
+        if not item or not self.photos or self.assigned[self.current] is not None:
+            return
+        name_id = item.data(Qt.UserRole)
+        name = self.index.names[name_id]
+        self.index.deactivate(name_id)
+        self.assigned[self.current] = name
+        self.undoStack.append((self.current, name_id))
+        self.itemAssociated.emit(self.photos[self.current][0], name)
+
+        self.searchEdit.clear()
+        self.moveTo(self.current + 1, 1)
+        self.updateCandidates()
+
+    def undo(self):
+        # Ignorer les associations déjà défaites hors du widget
+        while self.undoStack:
+            photo_index, name_id = self.undoStack.pop()
+            if self.assigned[photo_index] == self.index.names[name_id]:
+                break
+        else:
+            return
+        name = self.assigned[photo_index]
+        self.assigned[photo_index] = None
+        self.index.activate(name_id)
+        self.itemUnassociated.emit(self.photos[photo_index][0], name)
+
+        self.current = photo_index
+        self.showCurrent()
+        self.searchEdit.clear()
+        self.updateCandidates()
+
 # --- Widget pour la zone de drop de Fichiers (Page 2 et 3) ---
 
 class FileDropZone(QWidget):